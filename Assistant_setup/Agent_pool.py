@@ -0,0 +1,96 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from openai import NotFoundError
+
+from SemanthaVoiceAssistant.Assistant_setup.Assistant_logic import (
+    LOCAL_ASSISTANT_TOOLS, MAIN_ASSISTANT_TOOLS, initialize_local_main_assistant, initialize_main_assistant,
+    initialize_main_assistant_user_proxy,
+)
+from SemanthaVoiceAssistant.Assistant_setup.Conversation_memory import shared_conversation_memory
+
+ASSISTANT_IDS_FILE = "Config/assistant_ids.json"
+BACKEND_TOOLS = {
+    "gpt": MAIN_ASSISTANT_TOOLS,
+    "local": LOCAL_ASSISTANT_TOOLS,
+}
+
+
+class AgentPool:
+    """
+    Reuses assistants and their user proxies, keyed by (backend, instructions hash, tool set). A reused pair starts
+    with an empty chat, as a newly created one would.
+
+    Remote assistant IDs are persisted, so after a restart a known profile only retrieves its assistant instead
+    of searching, creating or updating it.
+    """
+
+    def __init__(self, ids_file: str = ASSISTANT_IDS_FILE):
+        self.ids_file = ids_file
+        self._agents = {}
+        self._assistant_ids = self._load_ids()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(backend: str, instructions: str) -> str:
+        instructions_hash = hashlib.sha256(instructions.encode("utf-8")).hexdigest()[:16]
+        tools_hash = hashlib.sha256(json.dumps(BACKEND_TOOLS[backend], sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        return f"{backend}:{instructions_hash}:{tools_hash}"
+
+    def _load_ids(self) -> dict:
+        try:
+            with open(self.ids_file, 'r') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError as e:
+            logging.error(f"Error decoding assistant IDs from '{self.ids_file}': {e}. Starting without known IDs.")
+            return {}
+
+    def _save_ids(self):
+        tmp_path = f"{self.ids_file}.tmp"
+        try:
+            with open(tmp_path, 'w') as file:
+                json.dump(self._assistant_ids, file, indent=4)
+            os.replace(tmp_path, self.ids_file)
+        except (PermissionError, IOError) as e:
+            logging.error(f"Error saving assistant IDs to file: {e}")
+
+    def _create_gpt_assistant(self, key: str, instructions: str):
+        assistant_id = self._assistant_ids.get(key)
+        try:
+            assistant = initialize_main_assistant(instructions, assistant_id=assistant_id)
+        except NotFoundError:
+            logging.info(f"Assistant {assistant_id} no longer exists remotely. Creating a new one.")
+            assistant = initialize_main_assistant(instructions)
+        if assistant.assistant_id != assistant_id:
+            self._assistant_ids[key] = assistant.assistant_id
+            self._save_ids()
+        return assistant
+
+    def get(self, backend: str, instructions: str):
+        """
+        Returns the (assistant, user_proxy) pair for a backend and instructions, creating it on first use.
+
+        :param backend: 'gpt' for the OpenAI assistant, 'local' for the local LLM endpoint.
+        :param instructions: The system instructions of the profile.
+        """
+        key = self.key(backend, instructions)
+        with self._lock:
+            if key not in self._agents:
+                if backend == "gpt":
+                    assistant = self._create_gpt_assistant(key, instructions)
+                elif backend == "local":
+                    assistant = initialize_local_main_assistant(instructions)
+                else:
+                    raise ValueError(f"Unknown assistant backend '{backend}'.")
+                self._agents[key] = (assistant, initialize_main_assistant_user_proxy())
+                logging.debug(f"Agent pool created agents for {key}")
+            else:
+                # Toggling back to a profile starts a new conversation rather than resuming the old one
+                assistant, user_proxy = self._agents[key]
+                shared_conversation_memory.clear_chat(user_proxy, assistant)
+            return self._agents[key]
@@ -8,27 +8,35 @@ from SemanthaVoiceAssistant.Function_calls.Web_surfer.Surfer_agent import query_
 
 logger = get_logger(log_level='ERROR')
 
+MAIN_ASSISTANT_TOOLS = [
+    {"type": "code_interpreter"},
+    {
+        "type": "function",
+        "function": query_web_schema,
+    },
+    {
+        "type": "function",
+        "function": fetch_and_read_pdf_schema,
+    },
+]
+LOCAL_ASSISTANT_TOOLS = [
+    {"type": "code_interpreter"},
+]
 
-def initialize_main_assistant(main_assistant_instructions, agent_name="Assistant"):
+
+def initialize_main_assistant(main_assistant_instructions, agent_name="Assistant", assistant_id=None):
     main_assistant_llm_config = {
         "config_list": config_list,
-        "tools": [
-            {"type": "code_interpreter"},
-            {
-                "type": "function",
-                "function": query_web_schema,
-            },
-            {
-                "type": "function",
-                "function": fetch_and_read_pdf_schema,
-            },
-        ],
+        "tools": MAIN_ASSISTANT_TOOLS,
     }
+    if assistant_id:
+        # A known assistant already carries these instructions and tools, so retrieving it is enough
+        main_assistant_llm_config["assistant_id"] = assistant_id
 
     main_assistant = GPTAssistantAgent(
         name=agent_name,
-        overwrite_instructions=True,
-        overwrite_tools=True,
+        overwrite_instructions=assistant_id is None,
+        overwrite_tools=assistant_id is None,
         instructions=main_assistant_instructions,
         llm_config=main_assistant_llm_config,
     )
@@ -39,12 +47,12 @@ def initialize_main_assistant(main_assistant_instructions, agent_name="Assistant
     )
 
     return main_assistant
+
+
 def initialize_local_main_assistant(main_assistant_instructions, agent_name="Assistant"):
     local_assistant_llm_config = {
         "config_list": config_list_local,
-        "tools": [
-            {"type": "code_interpreter"},
-        ],
+        "tools": LOCAL_ASSISTANT_TOOLS,
     }
     local_main_assistant = autogen.ConversableAgent(
         name=agent_name,
@@ -1,20 +1,50 @@
+import atexit
+import contextlib
 import json
 import logging
+import os
+import threading
+
+from SemanthaVoiceAssistant.Config.file_watch import stat_signature
+
+DEFAULT_FLUSH_DELAY = 0.2  # Seconds changes are held so a burst of them is written once
+
+_shared_managers = {}  # Absolute file path -> the first manager created for it
+_shared_managers_lock = threading.RLock()
 
 
 class ConfigurationManager:
     # IMPORTANT: Ensure this configuration file does not contain sensitive information like API keys or passwords.
     # Always use environment variables or secure storage for sensitive data.
-    def __init__(self, filename: str = 'Config/config_file.json'):
+    def __init__(self, filename: str = 'Config/config_file.json', flush_delay: float = DEFAULT_FLUSH_DELAY):
+        """
+        :param filename: Path of the JSON configuration file.
+        :param flush_delay: Seconds to wait after a change before writing the file, so a burst of changes is
+            written once. None writes every change immediately.
+        """
         self.filename = filename
+        self.flush_delay = flush_delay
+        self._signature = None  # Stat signature of the file as last read or written
         self.config = self.load_config()
         self._updated_keys_values = {}
+        self._pending = set()  # Keys changed in memory but not written yet
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._flush_timer = None
+        self._atexit_registered = False
+        self.writes = 0
+        with _shared_managers_lock:
+            _shared_managers.setdefault(os.path.abspath(filename), self)
+
+    def _read_config(self) -> dict:
+        self._signature = stat_signature(self.filename)
+        with open(self.filename, 'r') as file:
+            file_content = file.read()
+            return json.loads(file_content) if file_content else {}
 
     def load_config(self) -> dict:
         try:
-            with open(self.filename, 'r') as file:
-                file_content = file.read()
-                return json.loads(file_content) if file_content else {}
+            return self._read_config()
         except FileNotFoundError:
             logging.error(f"Configuration file '{self.filename}' not found. Starting with an empty configuration.")
             return {}
@@ -23,15 +53,94 @@ class ConfigurationManager:
                 f"Error decoding JSON from the file '{self.filename}': {e}. Starting with an empty configuration.")
             return {}
 
+    def reload_if_changed(self):
+        """
+        Re-read the file only if its stat signature (inode, size, mtime) changed since it was last read or written,
+        and make it the in-memory snapshot that get_config reads.
+
+        :return: The new configuration, or None when the file is unchanged. The unchanged case costs one os.stat.
+        """
+        if stat_signature(self.filename) == self._signature:
+            return None
+        with self._lock:
+            try:
+                config = self._read_config()
+            except (OSError, json.JSONDecodeError) as e:
+                # Possibly caught mid-write; the finished write changes the signature again
+                logging.error(f"Error reloading configuration from '{self.filename}': {e}. Keeping the current one.")
+                return None
+            # Changes not flushed yet still win over the file; written ones the file now overrides are forgotten, so
+            # the next write does not put back their old values
+            config.update({key: self.config[key] for key in self._pending if key in self.config})
+            for key in list(self._updated_keys_values):
+                if key not in self._pending:
+                    del self._updated_keys_values[key]
+            self.config = config
+        logging.debug(f"Configuration file '{self.filename}' changed on disk, reloaded it")
+        return self.config
+
     def get_config(self, key: str, default=None):
         return self.config.get(key, default)
 
     def set_config(self, key: str, value):
-        if key not in self.config or self.config[key] != value:
-            self.config[key] = value
-            self._updated_keys_values[key] = value
-            logging.debug(f"Configuration updated for key: {key}")
+        with self._lock:
+            if key not in self.config or self.config[key] != value:
+                self.config[key] = value
+                self._updated_keys_values[key] = value
+                self._pending.add(key)
+                logging.debug(f"Configuration updated for key: {key}")
+                self._schedule_flush()
+
+    def set_configs(self, values: dict):
+        """
+        Set several keys with a single write of the file.
+        """
+        with self.batch():
+            for key, value in values.items():
+                self.set_config(key, value)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Group changes into one transaction: nothing is written until the outermost batch ends, then all changes
+        are written together.
+        """
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0 and self._pending:
+                    self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._batch_depth:
+            return
+        if self.flush_delay is None:
             self.save_config()
+            return
+        if self._flush_timer is None:
+            # The timer runs once per burst; changes made while it waits are written with it
+            self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+            if not self._atexit_registered:
+                atexit.register(self.flush)
+                self._atexit_registered = True
+
+    def flush(self):
+        """
+        Write pending changes now instead of waiting for the debounce timer. Inside a batch this waits for the
+        batch to end.
+        """
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if self._pending and not self._batch_depth:
+                self.save_config()
 
     def check_updated_configs(self) -> dict:
         return self._updated_keys_values
@@ -41,17 +150,31 @@ class ConfigurationManager:
         logging.debug("Updated configuration tracking reset.")
 
     def save_config(self):
-        try:
-            with open(self.filename, 'w') as file:
-                self.config.update(self._updated_keys_values)
-                json.dump(self.config, file, indent=4)
-        except (FileNotFoundError, PermissionError, IOError) as e:
-            logging.error(f"Error saving configuration to file: {e}")
+        """
+        Write the whole configuration atomically: to a temporary file that replaces the original once it is
+        complete, so a crash mid-write leaves the old file intact instead of a truncated one.
+        """
+        tmp_path = f"{self.filename}.tmp"
+        with self._lock:
+            try:
+                with open(tmp_path, 'w') as file:
+                    self.config.update(self._updated_keys_values)
+                    json.dump(self.config, file, indent=4)
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.replace(tmp_path, self.filename)
+                self.writes += 1
+                self._pending.clear()
+                # Our own write is not an outside change
+                self._signature = stat_signature(self.filename)
+            except (FileNotFoundError, PermissionError, IOError) as e:
+                logging.error(f"Error saving configuration to file: {e}")
 
     def clear_config(self):
         # Add a safety check or confirmation if needed
-        self.config = {}
-        self.save_config()
+        with self._lock:
+            self.config = {}
+            self.save_config()
         logging.info("Configuration file content cleared.")
 
     def toggle(self, key: str, options: tuple):
@@ -76,4 +199,16 @@ class ConfigurationManager:
         """
         Toggles the voice feedback between 'on' and 'off'.
         """
-        self.toggle('voice_feedback', (True, False))
\ No newline at end of file
+        self.toggle('voice_feedback', (True, False))
+
+def shared_config_manager(filename: str = 'Config/config_file.json') -> ConfigurationManager:
+    """
+    The manager that owns a configuration file in this process: the first one created for it (main's Configuration
+    when the assistant runs), or a new one. Settings read through it come from its in-memory snapshot, which the
+    owner keeps current with reload_if_changed, and include changes that are not written yet.
+    """
+    with _shared_managers_lock:
+        manager = _shared_managers.get(os.path.abspath(filename))
+        if manager is None:
+            manager = ConfigurationManager(filename)
+        return manager
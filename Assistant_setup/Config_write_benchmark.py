@@ -0,0 +1,76 @@
+"""
+Counts configuration file writes per profile toggle, before and after batched, debounced writes.
+
+The benchmark replays the config changes of assistant start-up and profile toggles on a copy of config_file.json:
+once with a write per changed key (the previous behaviour), and once with every toggle in one batch and the
+debounced flush. It reports the writes and the time spent in set_config per toggle.
+
+Usage: python -m SemanthaVoiceAssistant.Assistant_setup.Config_write_benchmark
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from SemanthaVoiceAssistant.Assistant_setup.ConfigManager import DEFAULT_FLUSH_DELAY, ConfigurationManager
+
+CONFIG_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "Config", "config_file.json")
+TOGGLES = 10
+# The keys set at start-up and by each profile, as in main.Configuration. The start-up values all differ from the
+# shipped file, the worst case where every key is written.
+STARTUP = {"input_mode": "recording", "voice": "startup-voice", "voice_feedback": False, "content": "base"}
+PROFILES = [
+    {"voice": "zcAOhNBS3c14rBihAFp1", "content": "You are Sam. " * 60},
+    {"voice": "ThT5KcBeYPX3keUQqHPh", "content": "Semantha is highly intelligent AI. " * 40},
+]
+
+
+def replay(config_path: str, batched: bool) -> dict:
+    manager = ConfigurationManager(config_path, flush_delay=DEFAULT_FLUSH_DELAY if batched else None)
+    start = time.perf_counter()
+    if batched:
+        manager.set_configs(STARTUP)
+        manager.flush()
+    else:
+        for key, value in STARTUP.items():
+            manager.set_config(key, value)
+    startup_writes = manager.writes
+    for i in range(TOGGLES):
+        profile = PROFILES[i % len(PROFILES)]
+        if batched:
+            with manager.batch():
+                for key, value in profile.items():
+                    manager.set_config(key, value)
+            # Toggles further apart than the debounce delay are each written once
+            manager.flush()
+        else:
+            for key, value in profile.items():
+                manager.set_config(key, value)
+    elapsed = time.perf_counter() - start
+    return {
+        "startup_writes": startup_writes,
+        "writes_per_toggle": (manager.writes - startup_writes) / TOGGLES,
+        "ms_per_toggle": elapsed / (TOGGLES + 1) * 1000,
+    }
+
+
+def replay_burst(config_path: str) -> int:
+    # Toggles in quick succession, inside one debounce window, collapse into a single write
+    manager = ConfigurationManager(config_path)
+    for i in range(TOGGLES):
+        manager.set_configs(PROFILES[i % len(PROFILES)])
+    time.sleep(DEFAULT_FLUSH_DELAY * 2)
+    return manager.writes
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = os.path.join(tmp_dir, "config_file.json")
+        print(f"{'mode':<22}{'start-up writes':>17}{'writes/toggle':>15}{'time/toggle':>14}")
+        for name, batched in (("per key (before)", False), ("batched (after)", True)):
+            shutil.copy(CONFIG_FILE_PATH, config_path)
+            result = replay(config_path, batched)
+            print(f"{name:<22}{result['startup_writes']:>17}{result['writes_per_toggle']:>15.1f}"
+                  f"{result['ms_per_toggle']:>12.2f}ms")
+        shutil.copy(CONFIG_FILE_PATH, config_path)
+        print(f"{TOGGLES} toggles within {DEFAULT_FLUSH_DELAY * 1000:.0f} ms: {replay_burst(config_path)} write(s)")
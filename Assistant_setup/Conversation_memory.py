@@ -0,0 +1,328 @@
+"""
+Token-budgeted conversation memory for the assistant and web surfer chats.
+
+Usage: python -m SemanthaVoiceAssistant.Assistant_setup.Conversation_memory
+runs an offline session replay that compares the history sent per turn with and without the memory.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from autogen import ConversableAgent
+from autogen.agentchat.contrib.gpt_assistant_agent import GPTAssistantAgent
+from openai import OpenAI
+
+MEMORY_CONFIG_KEY = "conversation_memory"
+DEFAULT_MEMORY_CONFIG = {
+    "enabled": True,
+    "token_budget": 3000,  # History tokens per chat before older turns are summarised
+    "verbatim_turns": 4,  # Most recent turns that are always kept word for word
+}
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and an assistant. Keep the facts,
+decisions, names, open questions and user preferences that later turns may refer to; drop small talk. Write at most
+200 words of plain prose.
+
+Current summary:
+{summary}
+
+New turns to fold in:
+{turns}"""
+SUMMARY_PREAMBLE = "SUMMARY OF THE EARLIER CONVERSATION (for context, do not answer it):\n{summary}"
+CHARS_PER_TOKEN = 4  # Estimate used when tiktoken cannot load its encoding
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def count_tokens(text: str) -> int:
+    """
+    Token count of text with tiktoken's cl100k_base encoding, or an estimate of 4 characters per token when the
+    encoding is not available (it is downloaded on first use).
+    """
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                logging.info(f"tiktoken unavailable ({e}); estimating {CHARS_PER_TOKEN} characters per token")
+                _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def format_turns(turns) -> str:
+    return "\n".join(f"User: {user}\nAssistant: {answer}" for user, answer, _ in turns)
+
+
+def summarise_with_llm(summary: str, turns) -> str:
+    """
+    Fold turns into the summary with the first endpoint of the autogen config list.
+    """
+    from SemanthaVoiceAssistant.Config.Config_list import config_list
+
+    endpoint = config_list[0]
+    client = OpenAI(api_key=endpoint.get("api_key"), base_url=endpoint.get("base_url"))
+    prompt = SUMMARY_PROMPT.format(summary=summary or "(none yet)", turns=format_turns(turns))
+    response = client.chat.completions.create(model=endpoint["model"], temperature=0.0,
+                                              messages=[{"role": "user", "content": prompt}])
+    return response.choices[0].message.content.strip()
+
+
+class ChatMemory:
+    """
+    Memory of one user proxy/agent chat: every turn, the rolling summary, and which turns are in the live history.
+    """
+
+    def __init__(self):
+        self.turns = []  # (user message, answer, tokens)
+        self.summary = ""
+        self.summary_tokens = 0
+        self.folded = 0  # Turns covered by the summary in the live history
+        self.history_start = 0  # First turn still in the live history
+        self.pending = None  # Future of the rebase being prepared: (summary, folded, turns covered, thread or None)
+        self.records = []  # (turn number, history tokens sent, latency seconds)
+        self.system_notes = None  # Route system notes last sent in the live history
+
+    def history_tokens(self) -> int:
+        return self.summary_tokens + sum(tokens for _, _, tokens in self.turns[self.history_start:])
+
+
+class ConversationMemory:
+    """
+    Keeps each chat's history within a token budget.
+
+    The last verbatim_turns turns are always kept word for word. When the history grows past token_budget, the older
+    turns are folded into a rolling summary on a background thread, so no turn waits for it. For a GPT assistant the
+    same thread then creates the replacement OpenAI thread, holding the summary as a preamble followed by the recent
+    turns, with a single request. At the start of the next turn the chat is rebased without any request: the local
+    histories are refilled the same way and the prepared thread replaces the old one, which is deleted in the
+    background.
+    """
+
+    def __init__(self, token_budget=3000, verbatim_turns=4, enabled=True, summarise=summarise_with_llm):
+        """
+        :param token_budget: History tokens per chat before older turns are summarised.
+        :param verbatim_turns: Most recent turns that are always kept word for word.
+        :param enabled: Without it the memory only records tokens and latency.
+        :param summarise: Callable (summary, turns) -> new summary; an LLM call by default.
+        """
+        self.token_budget = token_budget
+        self.verbatim_turns = verbatim_turns
+        self.enabled = enabled
+        self.summarise = summarise
+        self._chats = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="conversation-summary")
+
+    def configure(self, token_budget=None, verbatim_turns=None, enabled=None):
+        if token_budget is not None:
+            self.token_budget = token_budget
+        if verbatim_turns is not None:
+            self.verbatim_turns = verbatim_turns
+        if enabled is not None:
+            self.enabled = enabled
+
+    def chat(self, user_proxy, agent) -> ChatMemory:
+        with self._lock:
+            return self._chats.setdefault((user_proxy, agent), ChatMemory())
+
+    def reset(self, user_proxy, agent):
+        """
+        Forget a chat whose history was cleared elsewhere, e.g. a web query that starts afresh.
+        """
+        with self._lock:
+            chat = self._chats.pop((user_proxy, agent), None)
+        if chat is not None and chat.pending is not None:
+            # The rebase being prepared is not needed any more; its thread is deleted once it is made
+            chat.pending.add_done_callback(lambda future: self._discard_rebase(agent, future))
+
+    def before_turn(self, user_proxy, agent, message=None):
+        """
+        Rebase the chat on its rolling summary if a new one is ready. Call before sending the next message.
+
+        :param message: The message about to be sent. A RoutePrompt whose system notes are already in the live history
+            has them replaced by a short reference.
+        :return: The message to send.
+        """
+        chat = self.chat(user_proxy, agent)
+        if chat.pending is not None and chat.pending.done():
+            self._apply_summary(user_proxy, agent, chat)
+        system_notes = getattr(message, "system_notes", None)
+        if system_notes and system_notes == chat.system_notes:
+            return message.with_notes_reference()
+        return message
+
+    def _apply_summary(self, user_proxy, agent, chat: ChatMemory):
+        future, chat.pending = chat.pending, None
+        try:
+            summary, folded, covered, thread = future.result()
+        except Exception as e:
+            logging.error(f"Conversation summary failed: {e}. Keeping the full history.")
+            return
+        if thread is not None and covered != len(chat.turns):
+            # Turns finished while the thread was made; make it again with them, still off the critical path
+            self._executor.submit(self._delete_thread, agent, thread.id)
+            chat.pending = self._executor.submit(self._prepare_rebase, agent, chat, summary, folded)
+            return
+        start = time.perf_counter()
+        chat.summary, chat.summary_tokens, chat.folded = summary, count_tokens(summary), folded
+        chat.history_start = folded
+        self.rebase(user_proxy, agent, chat, thread)
+        logging.debug(f"Rebased chat on a summary of {folded} turns in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def clear_chat(self, user_proxy, agent):
+        """
+        Start a chat afresh: clear both agents' history and forget the chat's memory.
+        """
+        self._clear_history(user_proxy, agent)
+        self.reset(user_proxy, agent)
+
+    def _clear_history(self, user_proxy, agent):
+        if isinstance(agent, GPTAssistantAgent):
+            # Clear the local history without autogen's blocking thread delete; the old thread is deleted meanwhile
+            ConversableAgent.clear_history(agent, user_proxy)
+            thread = agent._openai_threads.pop(user_proxy, None)
+            agent._unread_index[user_proxy] = 0
+            if thread is not None:
+                self._executor.submit(self._delete_thread, agent, thread.id)
+        else:
+            agent.clear_history(user_proxy)
+        user_proxy.clear_history(agent)
+
+    def rebase(self, user_proxy, agent, chat: ChatMemory, thread=None):
+        """
+        Replace the chat's history with the summary preamble and the turns from history_start on.
+
+        :param thread: OpenAI thread already holding that history, made by _prepare_rebase. Without it a GPT assistant
+            posts the history to a new thread one message at a time on its next run.
+        """
+        self._clear_history(user_proxy, agent)
+        # Notes in folded turns are gone, so the next routed prompt sends its notes in full again
+        chat.system_notes = None
+        # Sending without a reply only appends to the local histories
+        if chat.summary:
+            user_proxy.send(SUMMARY_PREAMBLE.format(summary=chat.summary), agent, request_reply=False, silent=True)
+        for user, answer, _ in chat.turns[chat.history_start:]:
+            user_proxy.send(user, agent, request_reply=False, silent=True)
+            agent.send(answer, user_proxy, request_reply=False, silent=True)
+        if thread is not None:
+            agent._openai_threads[user_proxy] = thread
+            agent._unread_index[user_proxy] = len(agent.chat_messages[user_proxy])
+
+    def _prepare_rebase(self, agent, chat: ChatMemory, summary: str, folded: int):
+        """
+        Make what the rebase needs from the network. For a GPT assistant that is the replacement OpenAI thread,
+        created with the summary preamble and every turn from folded on in one request.
+
+        :return: (summary, folded, turns covered, thread or None)
+        """
+        covered = len(chat.turns)
+        thread = None
+        if isinstance(agent, GPTAssistantAgent):
+            messages = [{"role": "user", "content": SUMMARY_PREAMBLE.format(summary=summary)}] if summary else []
+            for user, answer, _ in chat.turns[folded:covered]:
+                messages.append({"role": "user", "content": str(user)})
+                messages.append({"role": "assistant", "content": str(answer)})
+            start = time.perf_counter()
+            thread = agent.openai_client.beta.threads.create(
+                messages=[message for message in messages if message["content"].strip()])
+            logging.debug(f"Created the rebased OpenAI thread in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return summary, folded, covered, thread
+
+    def _discard_rebase(self, agent, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        thread = future.result()[3]
+        if thread is not None:
+            self._executor.submit(self._delete_thread, agent, thread.id)
+
+    @staticmethod
+    def _delete_thread(agent, thread_id):
+        try:
+            agent.openai_client.beta.threads.delete(thread_id)
+        except Exception as e:
+            logging.debug(f"Could not delete OpenAI thread {thread_id}: {e}")
+
+    def after_turn(self, user_proxy, agent, message, answer, latency):
+        """
+        Record a finished turn, and start summarising older turns once the history is over budget.
+
+        :param message: The message as sent, i.e. as returned by before_turn.
+        :param latency: Seconds the turn took, for the report.
+        """
+        chat = self.chat(user_proxy, agent)
+        if getattr(message, "system_notes", None):
+            chat.system_notes = message.system_notes
+        chat.records.append((len(chat.turns) + 1, chat.history_tokens() + count_tokens(message), latency))
+        chat.turns.append((message, answer, count_tokens(message) + count_tokens(answer)))
+        keep_from = len(chat.turns) - self.verbatim_turns
+        if (self.enabled and chat.pending is None and keep_from > chat.folded
+                and chat.history_tokens() > self.token_budget):
+            chat.pending = self._executor.submit(self._summarise, agent, chat, chat.summary,
+                                                 chat.turns[chat.folded:keep_from], keep_from)
+
+    def _summarise(self, agent, chat: ChatMemory, summary, turns, folded):
+        start = time.perf_counter()
+        new_summary = self.summarise(summary, turns)
+        logging.debug(f"Summarised {len(turns)} turns in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return self._prepare_rebase(agent, chat, new_summary, folded)
+
+    def stats(self) -> dict:
+        """
+        Per chat: turns, current history tokens and turns folded into the summary.
+        """
+        with self._lock:
+            chats = list(self._chats.items())
+        return {
+            f"{getattr(agent, 'name', agent)}": {
+                "turns": len(chat.turns),
+                "history_tokens": chat.history_tokens(),
+                "summarised_turns": chat.folded,
+            }
+            for (_, agent), chat in chats
+        }
+
+    def report(self, bucket=5):
+        """
+        Print mean history tokens sent and mean latency per block of turns, to show how they develop over a session.
+        """
+        with self._lock:
+            chats = list(self._chats.items())
+        for (_, agent), chat in chats:
+            print(f"{getattr(agent, 'name', agent)}:")
+            print(f"{'turns':<10}{'tokens/turn':>13}{'latency':>10}")
+            for first in range(0, len(chat.records), bucket):
+                block = chat.records[first:first + bucket]
+                tokens = sum(record[1] for record in block) / len(block)
+                latency = sum(record[2] for record in block) / len(block)
+                print(f"{f'{first + 1}-{first + len(block)}':<10}{tokens:>13.0f}{latency:>9.2f}s")
+
+
+# Shared by the assistant and web surfer chats; main.py applies the config file settings
+shared_conversation_memory = ConversationMemory(**DEFAULT_MEMORY_CONFIG)
+
+
+if __name__ == "__main__":
+    class ReplayAgent(ConversableAgent):
+        def __init__(self, name):
+            super().__init__(name, llm_config=False, human_input_mode="NEVER")
+
+    def truncating_summary(summary, turns):
+        # Offline stand-in for the LLM summariser: the gist of each turn
+        return (summary + " " + " ".join(user[:60] for user, _, _ in turns)).strip()[-800:]
+
+    session = [(f"Question {i}: tell me more about topic {i} and how it relates to the earlier ones. " * 3,
+                f"Answer {i}: here is a detailed explanation of topic {i}. " * 12) for i in range(40)]
+    for label, enabled in (("unbounded history", False), ("token-budgeted memory", True)):
+        memory = ConversationMemory(token_budget=3000, verbatim_turns=4, enabled=enabled, summarise=truncating_summary)
+        user_proxy, assistant = ReplayAgent("user"), ReplayAgent(label)
+        for message, answer in session:
+            memory.before_turn(user_proxy, assistant)
+            memory.after_turn(user_proxy, assistant, message, answer, latency=0.0)
+            if memory.chat(user_proxy, assistant).pending:
+                memory.chat(user_proxy, assistant).pending.result()  # Let the replay pick up every summary
+        memory.report(bucket=10)
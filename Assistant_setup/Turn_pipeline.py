@@ -0,0 +1,203 @@
+import logging
+import queue
+import threading
+import time
+
+from SemanthaVoiceAssistant.Config.cancellation import TurnController
+from SemanthaVoiceAssistant.Config.functions_utils import handle_agent_message, stream_agent_message
+from SemanthaVoiceAssistant.Config.recording_utils import text_to_speech
+from SemanthaVoiceAssistant.Config.speech_streaming import iter_sentences
+from SemanthaVoiceAssistant.Function_calls.Web_surfer.Surfer_agent import abort_web_query
+from SemanthaVoiceAssistant.Router_logic.RoutingManager import (
+    CONVERSATION_ACTIONS, analyze_turn, handle_action, prepare_prompt,
+)
+from SemanthaVoiceAssistant.Router_logic.Turn_embedding import TurnEmbedding
+
+PIPELINE_CONFIG_KEY = "turn_pipeline"
+DEFAULT_PIPELINE_CONFIG = {
+    "enabled": False,
+    "queue_size": 2,  # Items each stage may buffer before the previous stage blocks
+}
+
+
+class StageMetrics:
+    """
+    Per-stage counters: items handled, time items waited in the stage's inbox, time spent handling them,
+    and the deepest the inbox has been.
+    """
+
+    def __init__(self):
+        self.items = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+        self._lock = threading.Lock()
+
+    def record_depth(self, depth: int):
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def record_item(self, wait_seconds: float, busy_seconds: float):
+        with self._lock:
+            self.items += 1
+            self.wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+            self.busy_seconds += busy_seconds
+
+    def snapshot(self, queue_depth: int) -> dict:
+        with self._lock:
+            return {
+                "items": self.items,
+                "queue_depth": queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "mean_wait_ms": self.wait_seconds / self.items * 1000 if self.items else 0.0,
+                "max_wait_ms": self.max_wait_seconds * 1000,
+                "mean_busy_ms": self.busy_seconds / self.items * 1000 if self.items else 0.0,
+            }
+
+
+class PipelineStage:
+    """
+    One pipeline stage on its own thread. It takes items from a bounded inbox, hands them to its handler
+    and forwards whatever the handler emits to the next stage's inbox.
+
+    A stage without an inbox is a source: its handler is called repeatedly with None.
+    """
+
+    def __init__(self, name, handler, inbox=None, next_stage=None, queue_size=2):
+        self.name = name
+        self.handler = handler
+        self.inbox = queue.Queue(maxsize=queue_size) if inbox else None
+        self.next_stage = next_stage
+        self.metrics = StageMetrics()
+        self._thread = threading.Thread(target=self._run, name=f"pipeline-{name}", daemon=True)
+
+    def put(self, payload):
+        # Blocks while the inbox is full, which holds back the previous stage
+        self.inbox.put((payload, time.perf_counter()))
+        self.metrics.record_depth(self.inbox.qsize())
+
+    def emit(self, payload):
+        if self.next_stage is not None:
+            self.next_stage.put(payload)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            if self.inbox is None:
+                payload, wait_seconds = None, 0.0
+            else:
+                payload, enqueued_at = self.inbox.get()
+                wait_seconds = time.perf_counter() - enqueued_at
+            start = time.perf_counter()
+            try:
+                self.handler(payload, self.emit)
+            except Exception as e:
+                logging.error(f"Pipeline stage '{self.name}' failed: {e}")
+            self.metrics.record_item(wait_seconds, time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        return self.metrics.snapshot(self.inbox.qsize() if self.inbox else 0)
+
+
+class TurnPipeline:
+    """
+    Runs the main loop as four concurrent stages connected by bounded queues:
+
+    capture -> route -> LLM -> TTS
+
+    The next turn is captured while the current answer is generated and spoken. Control commands run in the
+    route stage and never reach the LLM. With streaming TTS the LLM stage forwards each sentence as soon as
+    it is complete, so speech starts before the answer is finished.
+
+    Each conversational turn carries a cancellation token. With barge-in enabled, a new input cancels the
+    turn still being answered: its run, web query and playback stop, and its queued sentences are dropped.
+    """
+
+    def __init__(self, input_handler, semantic_input_handler, config, assistant, queue_size=2,
+                 turn_controller=None):
+        self.input_handler = input_handler
+        self.semantic_input_handler = semantic_input_handler
+        self.config = config
+        self.assistant = assistant
+        self.turn_controller = turn_controller or TurnController()
+        self.tts_stage = PipelineStage("tts", self.speak, inbox=True, queue_size=queue_size)
+        self.llm_stage = PipelineStage("llm", self.generate, inbox=True, next_stage=self.tts_stage,
+                                       queue_size=queue_size)
+        self.route_stage = PipelineStage("route", self.route, inbox=True, next_stage=self.llm_stage,
+                                         queue_size=queue_size)
+        self.capture_stage = PipelineStage("capture", self.capture, next_stage=self.route_stage)
+        self.stages = [self.capture_stage, self.route_stage, self.llm_stage, self.tts_stage]
+
+    def capture(self, _, emit):
+        input_result = self.input_handler.get_input()
+        if input_result:
+            emit(input_result)
+
+    def route(self, input_result, emit):
+        turn_embedding = TurnEmbedding(input_result)
+        analysis_result = analyze_turn(self.semantic_input_handler.get(), input_result, turn_embedding,
+                                       parallel=self.config.get_parallel_routing_enabled())
+        action = analysis_result["action"]
+        if action in CONVERSATION_ACTIONS:
+            prompt = analysis_result.get("prompt") or prepare_prompt(action, input_result, turn_embedding)
+            if self.config.get_barge_in_enabled():
+                self.turn_controller.cancel_current("new input")
+            emit((self.turn_controller.start_turn(), prompt))
+        else:
+            handle_action(self.config, self.assistant, analysis_result, input_result, turn_embedding)
+        self.config.load_and_update_config()
+
+    def generate(self, turn, emit):
+        cancel_token, prompt = turn
+        try:
+            if cancel_token.cancelled:
+                return
+            cancel_token.on_cancel(abort_web_query)
+            user_proxy, main_assistant = self.assistant.user_proxy, self.assistant.main_assistant
+            if not self.config.get_voice_feedback_enabled():
+                handle_agent_message(prompt, user_proxy, main_assistant, cancel_token)
+            elif self.config.get_streaming_tts_enabled():
+                chunks = stream_agent_message(prompt, user_proxy, main_assistant, cancel_token)
+                for sentence in iter_sentences(chunks):
+                    if cancel_token.cancelled:
+                        break
+                    emit((cancel_token, sentence))
+            else:
+                answer = handle_agent_message(prompt, user_proxy, main_assistant, cancel_token)
+                if answer:
+                    emit((cancel_token, answer))
+        finally:
+            emit((cancel_token, None))  # End of turn marker for the TTS stage
+
+    def speak(self, turn, _):
+        cancel_token, text = turn
+        if text is None:
+            self.turn_controller.finish_turn(cancel_token)
+        elif not cancel_token.cancelled:
+            text_to_speech(text, voice_id=self.config.get_voice_id(), cancel_token=cancel_token)
+
+    def run(self):
+        """
+        Starts every stage and blocks until interrupted, then logs the stage metrics.
+        """
+        for stage in reversed(self.stages):
+            stage.start()
+        try:
+            while True:
+                time.sleep(1)
+        finally:
+            self.report()
+
+    def stats(self) -> dict:
+        return {stage.name: stage.stats() for stage in self.stages}
+
+    def report(self):
+        print(f"{'stage':<10}{'items':>7}{'depth':>7}{'max depth':>11}{'mean wait':>12}{'max wait':>12}"
+              f"{'mean busy':>12}")
+        for name, stats in self.stats().items():
+            print(f"{name:<10}{stats['items']:>7}{stats['queue_depth']:>7}{stats['max_queue_depth']:>11}"
+                  f"{stats['mean_wait_ms']:>10.0f}ms{stats['max_wait_ms']:>10.0f}ms{stats['mean_busy_ms']:>10.0f}ms")
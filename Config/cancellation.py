@@ -0,0 +1,94 @@
+import logging
+import threading
+import time
+
+
+class CancellationToken:
+    """
+    Cancellation signal for one turn.
+
+    Components doing blocking work register a callback with on_cancel (kill the audio player, cancel the remote
+    run, abort the web query). The callbacks run as soon as cancel is called, so the blocking call returns
+    without waiting for the work to finish by itself.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self.cancelled_at = None
+        self.reason = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def on_cancel(self, callback):
+        """
+        Register a callback to run on cancellation. It runs immediately if the token is already cancelled.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        self._run_callback(callback)
+
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.cancelled_at = time.perf_counter()
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            self._run_callback(callback)
+
+    @staticmethod
+    def _run_callback(callback):
+        try:
+            callback()
+        except Exception as e:
+            logging.error(f"Cancellation callback failed: {e}")
+
+
+class TurnController:
+    """
+    Tracks the turn in progress so it can be cancelled from elsewhere (barge-in), and measures cancellation
+    latency: the time from the cancel request until the turn has stopped.
+    """
+
+    def __init__(self):
+        self._current = None
+        self._lock = threading.Lock()
+        self.latencies = []
+
+    def start_turn(self) -> CancellationToken:
+        token = CancellationToken()
+        with self._lock:
+            self._current = token
+        return token
+
+    def cancel_current(self, reason: str = "barge-in"):
+        with self._lock:
+            token = self._current
+        if token is not None:
+            token.cancel(reason)
+
+    def finish_turn(self, token: CancellationToken):
+        with self._lock:
+            if self._current is token:
+                self._current = None
+        if token.cancelled:
+            latency = time.perf_counter() - token.cancelled_at
+            self.latencies.append(latency)
+            logging.info(f"Turn cancelled ({token.reason}) and stopped in {latency * 1000:.0f} ms")
+
+    def stats(self) -> dict:
+        if not self.latencies:
+            return {"cancellations": 0, "mean_ms": 0.0, "max_ms": 0.0}
+        return {
+            "cancellations": len(self.latencies),
+            "mean_ms": sum(self.latencies) / len(self.latencies) * 1000,
+            "max_ms": max(self.latencies) * 1000,
+        }
@@ -0,0 +1,233 @@
+import collections
+import glob
+import logging
+import os
+import sys
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 512  # Samples per frame, as expected by both Porcupine and Cobra at 16 kHz
+FRAME_SECONDS = FRAME_LENGTH / SAMPLE_RATE
+ENDPOINTING_MODES = ("fixed", "adaptive")
+
+
+def seconds_to_frames(seconds: float) -> int:
+    return max(1, int(seconds * SAMPLE_RATE / FRAME_LENGTH))
+
+
+def frame_energy_db(samples) -> float:
+    rms = np.sqrt(np.mean(np.square(samples, dtype=np.float64)))
+    return 20.0 * np.log10(max(rms, 1.0))
+
+
+class FixedEndpointer:
+    """
+    Ends the utterance after a fixed stretch of silence, like the toolkit's recorder.
+    """
+
+    def __init__(self, inactivity_limit=2.5, min_recording_length=3):
+        self.inactivity_limit = inactivity_limit
+        self.min_recording_length = min_recording_length
+        self._silent_frames = 0
+
+    def reset(self):
+        self._silent_frames = 0
+
+    def observe_background(self, samples):
+        pass
+
+    def update(self, samples, voiced: bool) -> bool:
+        self._silent_frames = 0 if voiced else self._silent_frames + 1
+        return self._silent_frames >= seconds_to_frames(self.inactivity_limit)
+
+    def accepts(self, recording_seconds: float) -> bool:
+        return recording_seconds >= self.min_recording_length
+
+
+class AdaptiveEndpointer:
+    """
+    Ends the utterance once the silence is longer than the speaker's usual pauses.
+
+    The pauses inside each utterance are kept in a history, and the silence needed to end the next utterance
+    (the hangover) is a high percentile of those pauses plus a margin. It stays between min_hangover and
+    max_hangover. Until enough pauses are known, initial_hangover is used. The noise floor is tracked on
+    unvoiced frames. Silence close to the floor counts fully towards the hangover. Unvoiced frames well
+    above the floor (breathing, a trailing word the VAD missed) count half, so the endpointer waits longer
+    when it is unsure. It never waits longer than max_hangover, which matches the fixed limit.
+    """
+
+    def __init__(self, max_hangover=2.5, min_hangover=0.5, initial_hangover=1.2, pause_percentile=90,
+                 pause_margin=1.3, min_pause=0.15, min_pauses=5, pause_history=50, min_speech_seconds=0.25,
+                 noise_margin_db=6.0, noise_rise=0.01):
+        self.max_hangover = max_hangover
+        self.min_hangover = min_hangover
+        self.initial_hangover = initial_hangover
+        self.pause_percentile = pause_percentile
+        self.pause_margin = pause_margin
+        self.min_pause = min_pause
+        self.min_pauses = min_pauses
+        self.min_speech_seconds = min_speech_seconds
+        self.noise_margin_db = noise_margin_db
+        self.noise_rise = noise_rise
+        self.pauses = collections.deque(maxlen=pause_history)
+        self.noise_floor_db = None
+        self.hangover = initial_hangover
+        self.reset()
+
+    def learned_hangover(self) -> float:
+        if len(self.pauses) < self.min_pauses:
+            return self.initial_hangover
+        hangover = np.percentile(self.pauses, self.pause_percentile) * self.pause_margin
+        return float(np.clip(hangover, self.min_hangover, self.max_hangover))
+
+    def reset(self):
+        self.hangover = self.learned_hangover()
+        self.voiced_seconds = 0.0
+        self._silence_seconds = 0.0
+        self._weighted_silence = 0.0
+
+    def _update_noise_floor(self, energy_db: float):
+        # Falls immediately to quieter frames and rises slowly, so short noises barely move it
+        if self.noise_floor_db is None or energy_db < self.noise_floor_db:
+            self.noise_floor_db = energy_db
+        else:
+            self.noise_floor_db += self.noise_rise * (energy_db - self.noise_floor_db)
+
+    def observe_background(self, samples):
+        self._update_noise_floor(frame_energy_db(samples))
+
+    def update(self, samples, voiced: bool) -> bool:
+        if voiced:
+            if self.voiced_seconds > 0 and self._silence_seconds >= self.min_pause:
+                self.pauses.append(self._silence_seconds)
+            self.voiced_seconds += FRAME_SECONDS
+            self._silence_seconds = 0.0
+            self._weighted_silence = 0.0
+            return False
+
+        energy_db = frame_energy_db(samples)
+        self._update_noise_floor(energy_db)
+        quiet = energy_db < self.noise_floor_db + self.noise_margin_db
+        self._silence_seconds += FRAME_SECONDS
+        self._weighted_silence += FRAME_SECONDS if quiet else FRAME_SECONDS / 2
+        if self._silence_seconds >= self.max_hangover:
+            return True
+        return self.voiced_seconds >= self.min_speech_seconds and self._weighted_silence >= self.hangover
+
+    def accepts(self, recording_seconds: float) -> bool:
+        # The recording is short when the endpoint is early, so judge it by the amount of speech instead
+        return self.voiced_seconds >= self.min_speech_seconds
+
+
+def create_endpointer(mode="fixed", inactivity_limit=2.5, min_recording_length=3):
+    """
+    Create the end-of-speech detector for a capture session.
+
+    :param mode: 'fixed' waits inactivity_limit seconds of silence. 'adaptive' learns the speaker's pauses and
+        the noise floor, and waits at most inactivity_limit.
+    :param inactivity_limit: Seconds of silence that always end the utterance.
+    :param min_recording_length: Shortest recording kept in fixed mode, in seconds.
+    """
+    if mode == "fixed":
+        return FixedEndpointer(inactivity_limit=inactivity_limit, min_recording_length=min_recording_length)
+    if mode == "adaptive":
+        return AdaptiveEndpointer(max_hangover=inactivity_limit)
+    raise ValueError(f"Unknown endpointing mode '{mode}'. Choose one of {ENDPOINTING_MODES}.")
+
+
+def read_wav_frames(path: str) -> list:
+    with wave.open(path, 'rb') as wf:
+        if wf.getframerate() != SAMPLE_RATE or wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise ValueError(f"'{path}' must be 16 kHz mono 16-bit PCM.")
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    return [samples[i:i + FRAME_LENGTH] for i in range(0, len(samples) - FRAME_LENGTH + 1, FRAME_LENGTH)]
+
+
+def simulate_endpoint(endpointer, frames, voiced):
+    """
+    Streams one recorded utterance through an endpointer, as the capture session does.
+
+    :return: A dict with the endpoint frame (None if it never fired) and the last voiced frame, or None when
+        the file has no speech.
+    """
+    voiced_indexes = [i for i, is_voiced in enumerate(voiced) if is_voiced]
+    if not voiced_indexes:
+        return None
+    onset, last_voiced = voiced_indexes[0], voiced_indexes[-1]
+    for samples in frames[:onset]:
+        endpointer.observe_background(samples)
+    endpointer.reset()
+    endpoint = None
+    for i in range(onset, len(frames)):
+        if endpointer.update(frames[i], voiced[i]):
+            endpoint = i
+            break
+    return {"endpoint": endpoint, "last_voiced": last_voiced, "length": len(frames)}
+
+
+def evaluate_endpointing(wav_paths, voice_threshold=0.9, inactivity_limit=2.5):
+    """
+    Replays recorded utterances through the fixed and the adaptive endpointer.
+
+    The files are replayed in order, so the adaptive endpointer learns across them as it does across turns.
+    Each file should hold one utterance followed by at least inactivity_limit seconds of silence. The end of
+    speech is the last frame Cobra marks as voiced. An endpoint before that frame is a cut-off. Latency is the
+    time from the end of speech to the endpoint.
+    """
+    import pvcobra
+
+    vad = pvcobra.create(access_key=os.getenv('PICOVOICE_APIKEY'))
+    try:
+        recordings = []
+        for path in wav_paths:
+            frames = read_wav_frames(path)
+            recordings.append((path, frames, [vad.process(samples) > voice_threshold for samples in frames]))
+    finally:
+        vad.delete()
+
+    endpointers = {
+        "fixed": create_endpointer("fixed", inactivity_limit=inactivity_limit),
+        "adaptive": create_endpointer("adaptive", inactivity_limit=inactivity_limit),
+    }
+    results = {mode: {"latencies": [], "cut_offs": 0, "lost_seconds": 0.0} for mode in endpointers}
+    evaluated = 0
+    for path, frames, voiced in recordings:
+        outcomes = {mode: simulate_endpoint(endpointer, frames, voiced) for mode, endpointer in endpointers.items()}
+        if outcomes["fixed"] is None:
+            logging.info(f"No speech found in '{path}'. Skipped.")
+            continue
+        evaluated += 1
+        for mode, outcome in outcomes.items():
+            endpoint = outcome["endpoint"] if outcome["endpoint"] is not None else outcome["length"]
+            if endpoint < outcome["last_voiced"]:
+                results[mode]["cut_offs"] += 1
+                results[mode]["lost_seconds"] += (outcome["last_voiced"] - endpoint) * FRAME_SECONDS
+            else:
+                results[mode]["latencies"].append((endpoint - outcome["last_voiced"]) * FRAME_SECONDS)
+
+    print(f"Evaluated {evaluated} recordings")
+    print(f"{'mode':<10}{'cut-offs':>10}{'lost speech':>14}{'median latency':>17}{'mean latency':>15}")
+    for mode, result in results.items():
+        latencies = result["latencies"] or [float("nan")]
+        print(f"{mode:<10}{result['cut_offs']:>10}{result['lost_seconds']:>13.2f}s"
+              f"{np.median(latencies):>16.2f}s{np.mean(latencies):>14.2f}s")
+    saved = np.mean(results["fixed"]["latencies"] or [np.nan]) - np.mean(results["adaptive"]["latencies"] or [np.nan])
+    print(f"Mean end-of-speech latency saved by adaptive endpointing: {saved:.2f}s per turn")
+    print(f"Learned hangover: {endpointers['adaptive'].learned_hangover():.2f}s, "
+          f"noise floor: {endpointers['adaptive'].noise_floor_db or 0:.1f} dB")
+    return results
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    if len(sys.argv) < 2:
+        print("Usage: python -m SemanthaVoiceAssistant.Config.endpointing <wav directory or files>")
+        sys.exit(1)
+    paths = []
+    for arg in sys.argv[1:]:
+        paths.extend(sorted(glob.glob(os.path.join(arg, "*.wav"))) if os.path.isdir(arg) else [arg])
+    evaluate_endpointing(paths)
@@ -0,0 +1,93 @@
+import logging
+import os
+import threading
+
+DEFAULT_POLL_INTERVAL = 1.0  # Seconds between stat checks
+
+
+def stat_signature(path: str):
+    """
+    Cheap change signature of a file: (inode, size, modification time in ns), or None if it does not exist.
+
+    An atomic replace changes the inode and an in-place write changes the size or modification time, so
+    comparing signatures detects both without reading the file.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class FileWatcher:
+    """
+    Polls the stat signature of watched files on one daemon thread and calls back when a file changes.
+
+    A change is reported once the signature has been stable for one poll, so an editor that writes a file in several
+    steps triggers a single callback with the finished file.
+    """
+
+    def __init__(self, interval: float = DEFAULT_POLL_INTERVAL):
+        self.interval = interval
+        self._watches = {}  # path -> [signature, pending signature, callbacks]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watch(self, path: str, callback):
+        """
+        Call callback(path) whenever the file at path changes. Starts the polling thread on first use.
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            watch = self._watches.setdefault(path, [stat_signature(path), None, []])
+            watch[2].append(callback)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="file-watcher", daemon=True)
+                self._thread.start()
+
+    def unwatch(self, path: str, callback):
+        path = os.path.abspath(path)
+        with self._lock:
+            watch = self._watches.get(path)
+            if watch and callback in watch[2]:
+                watch[2].remove(callback)
+                if not watch[2]:
+                    del self._watches[path]
+
+    def check(self) -> list:
+        """
+        Poll every watched file once and run the callbacks of files whose change has settled.
+
+        :return: The paths reported as changed.
+        """
+        changed = []
+        with self._lock:
+            for path, watch in self._watches.items():
+                signature = stat_signature(path)
+                if signature == watch[0]:
+                    watch[1] = None
+                elif signature != watch[1]:
+                    watch[1] = signature  # Still being written; report it once it settles
+                else:
+                    watch[0], watch[1] = signature, None
+                    changed.append((path, list(watch[2])))
+        for path, callbacks in changed:
+            logging.info(f"Detected a change to '{path}'")
+            for callback in callbacks:
+                try:
+                    callback(path)
+                except Exception as e:
+                    logging.error(f"File watch callback for '{path}' failed: {e}")
+        return [path for path, _ in changed]
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def stop(self):
+        self._stop.set()
+
+
+# Shared by everything that hot-reloads a file, so all watches run on one thread
+shared_file_watcher = FileWatcher()
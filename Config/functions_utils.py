@@ -1,11 +1,20 @@
 import logging
 import os
 import re
+import time
 
+from autogen.agentchat.contrib.gpt_assistant_agent import GPTAssistantAgent
+from openai import OpenAI
+
+from SemanthaVoiceAssistant.Assistant_setup.Conversation_memory import shared_conversation_memory
 from SemanthaVoiceAssistant.Config.log_config import get_logger
 
 logger = get_logger(log_level='ERROR')
 
+ACTIVE_RUN_STATUSES = ("queued", "in_progress", "requires_action", "cancelling")
+RUN_SETTLE_TIMEOUT = 10.0  # Seconds to wait for a cancelled run to finish before starting the next one
+_threads_with_cancelled_runs = set()
+
 
 def print_in_bold_green(text):
     # ANSI escape codes for green and bold text
@@ -56,28 +65,146 @@ def is_termination_msg(content) -> bool:
     return content.get("content", "").strip().endswith(("TERMINATE", "TERMINATE."))
 
 
-def handle_agent_message(message, user_proxy, assistant):
+def cancel_assistant_run(assistant, user_proxy):
+    """
+    Cancels the active OpenAI Assistants run on the thread between the user proxy and a GPT assistant.
+
+    autogen's polling loop then stops on the non-running status and initiate_chat returns.
+    """
+    thread = assistant._openai_threads.get(user_proxy)
+    if thread is None:
+        return
+    client = assistant.openai_client
+    for run in client.beta.threads.runs.list(thread_id=thread.id, limit=5):
+        if run.status in ACTIVE_RUN_STATUSES and run.status != "cancelling":
+            client.beta.threads.runs.cancel(run.id, thread_id=thread.id)
+            _threads_with_cancelled_runs.add(thread.id)
+            logger.debug(f"Cancelled assistant run {run.id}")
+
+
+def wait_for_cancelled_runs(assistant, user_proxy):
+    """
+    Waits until a cancelled run has stopped, as a thread with an active run rejects new messages.
+    """
+    thread = assistant._openai_threads.get(user_proxy)
+    if thread is None or thread.id not in _threads_with_cancelled_runs:
+        return
+    client = assistant.openai_client
+    deadline = time.monotonic() + RUN_SETTLE_TIMEOUT
+    while time.monotonic() < deadline:
+        runs = client.beta.threads.runs.list(thread_id=thread.id, limit=5)
+        if not any(run.status in ACTIVE_RUN_STATUSES for run in runs):
+            break
+        time.sleep(0.2)
+    _threads_with_cancelled_runs.discard(thread.id)
+
+
+def _mark_messages_sent(assistant, user_proxy):
+    # The message is already on the OpenAI thread; without this autogen posts it again with the next turn
+    assistant._unread_index[user_proxy] = len(assistant.chat_messages[user_proxy])
+
+
+def handle_agent_message(message, user_proxy, assistant, cancel_token=None):
     """
     Processes the message from the agent and returns the assistant's response.
     :param message: The message sent by the agent.
     :param user_proxy: The user proxy object.
     :param assistant: The assistant object.
+    :param cancel_token: Optional CancellationToken. Cancelling it cancels a GPT assistant's remote run; a local
+        assistant's reply is discarded when it arrives.
     :return: The assistant's response or an error message.
     """
     if not message or not assistant or not user_proxy:
         logger.debug("Invalid input received in handle_agent_message")
         return None
 
+    is_gpt_assistant = isinstance(assistant, GPTAssistantAgent)
+    if is_gpt_assistant:
+        wait_for_cancelled_runs(assistant, user_proxy)
+        if cancel_token:
+            cancel_token.on_cancel(lambda: cancel_assistant_run(assistant, user_proxy))
+    # History is kept across turns; the memory holds it within its token budget
+    message = shared_conversation_memory.before_turn(user_proxy, assistant, message)
+    start = time.perf_counter()
     try:
         user_proxy.initiate_chat(recipient=assistant, message=message, clear_history=False)
+        if cancel_token and cancel_token.cancelled:
+            return None
         latest_message = assistant.last_message().get("content", "").strip()
         answer = strip_terminator(latest_message)
         logger.debug(answer)
+        shared_conversation_memory.after_turn(user_proxy, assistant, message, latest_message,
+                                              time.perf_counter() - start)
         return answer
+    except KeyboardInterrupt:
+        # Ctrl+C interrupts the turn; the caller cancels the remote run
+        if is_gpt_assistant:
+            _mark_messages_sent(assistant, user_proxy)
+        raise
     except Exception as e:
+        if cancel_token and cancel_token.cancelled:
+            if is_gpt_assistant:
+                _mark_messages_sent(assistant, user_proxy)
+            logger.debug("Assistant run cancelled")
+            return None
         logger.debug(f"An error occurred in handle_agent_message: {e}")
         return None
 
 
+def stream_agent_message(message, user_proxy, assistant, cancel_token=None):
+    """
+    Yields the assistant's response in chunks as it is generated.
+
+    Local (chat completion) assistants stream tokens directly from their endpoint, and the exchange is then recorded
+    in both agents' history. GPT assistants run through the Assistants API, which autogen does not stream, so their
+    full answer is yielded once it is ready.
+    :param message: The message sent by the agent.
+    :param user_proxy: The user proxy object.
+    :param assistant: The assistant object.
+    :param cancel_token: Optional CancellationToken; cancelling it closes the completion stream.
+    """
+    if not message or not assistant or not user_proxy:
+        logger.debug("Invalid input received in stream_agent_message")
+        return
+
+    if isinstance(assistant, GPTAssistantAgent):
+        answer = handle_agent_message(message, user_proxy, assistant, cancel_token)
+        if answer:
+            yield answer
+        return
+
+    message = shared_conversation_memory.before_turn(user_proxy, assistant, message)
+    start = time.perf_counter()
+    endpoint = assistant.llm_config["config_list"][0]
+    client = OpenAI(api_key=endpoint.get("api_key"), base_url=endpoint.get("base_url"))
+    messages = (
+        [{"role": "system", "content": assistant.system_message}]
+        + [{"role": m["role"], "content": m["content"]} for m in assistant.chat_messages.get(user_proxy, [])]
+        + [{"role": "user", "content": message}]
+    )
+    answer = ""
+    try:
+        completion = client.chat.completions.create(model=endpoint["model"], messages=messages, stream=True)
+        if cancel_token:
+            cancel_token.on_cancel(completion.close)
+        for chunk in completion:
+            if cancel_token and cancel_token.cancelled:
+                break
+            token = chunk.choices[0].delta.content if chunk.choices else None
+            if token:
+                answer += token
+                print(token, end="", flush=True)
+                yield token
+    except Exception as e:
+        logger.debug(f"An error occurred in stream_agent_message: {e}")
+    finally:
+        print()
+        # A cancelled (barged-in) reply was not heard in full, so it does not become context for the next turn
+        if answer and not (cancel_token and cancel_token.cancelled):
+            user_proxy.send(message, assistant, request_reply=False, silent=True)
+            assistant.send(answer, user_proxy, request_reply=False, silent=True)
+            shared_conversation_memory.after_turn(user_proxy, assistant, message, answer, time.perf_counter() - start)
+
+
 def handle_error(exception):
     logging.error(f"Error in main loop: {exception}", exc_info=True)
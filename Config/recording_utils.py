@@ -1,36 +1,68 @@
+import contextlib
 import os
 import logging
+import threading
 
-from VoiceProcessingToolkit.VoiceProcessingManager import VoiceProcessingManager, text_to_speech_stream
+from VoiceProcessingToolkit.VoiceProcessingManager import text_to_speech_stream
+
+from SemanthaVoiceAssistant.Assistant_setup.ConfigManager import shared_config_manager
+from SemanthaVoiceAssistant.Config.speech_streaming import speak_text
+from SemanthaVoiceAssistant.Config.voice_capture import VoiceCaptureSession
 
 # Configure logging as needed, e.g., logging level, format, handlers
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+CONFIG_FILE_PATH = "Config/config_file.json"
+DEFAULT_VOICE_ENDPOINTING = "fixed"
+
+_capture_session = None
+_capture_session_lock = threading.Lock()
+
+
+def get_capture_session():
+    """
+    Returns the voice capture session, opening it on first use. It stays open across turns.
+
+    The 'voice_endpointing' config setting picks how the end of speech is detected: 'fixed' (the default) always
+    waits for the 2.5 second inactivity limit, 'adaptive' learns the speaker's pauses and ends the turn sooner. Run
+    the offline evaluation in Config/endpointing.py on your own recordings before opting in to 'adaptive'.
+    """
+    global _capture_session
+    with _capture_session_lock:
+        if _capture_session is None:
+            _capture_session = VoiceCaptureSession(
+                wake_word="computer",
+                min_recording_length=3,
+                inactivity_limit=2.5,
+                sensitivity=0.5,
+                voice_threshold=0.9,
+                endpointing=shared_config_manager(CONFIG_FILE_PATH).get_config(
+                    "voice_endpointing", DEFAULT_VOICE_ENDPOINTING),
+            )
+        return _capture_session
+
 
-def get_user_input(play_notification_sound=True, use_wake_word=False, tts=False):
+def get_user_input(play_notification_sound=True, use_wake_word=False, tts=False, on_partial=None,
+                   on_wake_word=None):
     """
     Captures user input via voice, transcribes it, and returns the transcription.
 
     Args:
     - play_notification_sound (bool): Whether to play a notification sound before capturing user input.
     - use_wake_word (bool): Whether to use a wake word to initiate user input capture.
-    - streaming (bool): Whether to use streaming mode for voice capture.
-    """
-    vpm = VoiceProcessingManager.create_default_instance(
-        use_wake_word=True or use_wake_word,
-        play_notification_sound=True or play_notification_sound,
-        wake_word="computer",
-        min_recording_length=3,
-        inactivity_limit=2.5,
-        sensitivity=0.5,
-        voice_threshold=0.9,
-    )
+    - tts (bool): Whether to read the transcription back with text-to-speech.
+    - on_partial (callable): Called with partial transcripts while the user is still speaking.
+    - on_wake_word (callable): Called as soon as the wake word is detected, e.g. to interrupt the current answer.
+    """
+    session = get_capture_session()
     logging.info("Listening for user input...")
     print("Listening for user input...")
 
     transcription = None
     while transcription is None:
-        transcription = vpm.run(tts=False or tts)
+        transcription = session.capture(on_partial, on_wake_word)
+        if transcription and tts:
+            text_to_speech(transcription)
         if transcription is None:
             logging.debug("Recording was not made or was too short. Retrying...")
             print("Recording was not made or was too short. Retrying...")
@@ -39,7 +71,26 @@ def get_user_input(play_notification_sound=True, use_wake_word=False, tts=False)
     return transcription
 
 
-def text_to_speech(text, eleven_labs_api_key=None, voice_id=None):
+@contextlib.contextmanager
+def listen_for_barge_in(cancel_token):
+    """
+    Listens for the wake word while a turn is being answered, and cancels the turn when it is heard.
+
+    The capture session's stream is idle during a turn, so the listener reads it until the block exits.
+    """
+    session = get_capture_session()
+    stop = threading.Event()
+    listener = threading.Thread(target=session.watch_for_wake_word, args=(cancel_token, stop),
+                                name="barge-in-listener", daemon=True)
+    listener.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        listener.join()
+
+
+def text_to_speech(text, eleven_labs_api_key=None, voice_id=None, cancel_token=None):
     """
     Converts the given text to speech and streams it.
 
@@ -47,10 +98,14 @@ def text_to_speech(text, eleven_labs_api_key=None, voice_id=None):
     - text (str): The text to be converted to speech.
     - eleven_labs_api_key (str): The API key for the ElevenLabs service, if not using the environment variable.
     - voice_id (str): The ID of the voice to use for speech synthesis.
+    - cancel_token (CancellationToken): Stops playback mid-sentence when the turn is cancelled.
     """
     try:
         api_key = eleven_labs_api_key or os.getenv('ELEVENLABS_API_KEY')
-        text_to_speech_stream(text=text, api_key=api_key, voice_id=voice_id)
+        if cancel_token:
+            speak_text(text, voice_id=voice_id, eleven_labs_api_key=api_key, cancel_token=cancel_token)
+        else:
+            text_to_speech_stream(text=text, api_key=api_key, voice_id=voice_id)
         logging.info(f"Assistant said: {text}")
         return text
     except Exception as e:
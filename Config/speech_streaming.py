@@ -0,0 +1,187 @@
+import logging
+import os
+import queue
+import re
+import subprocess
+import threading
+import time
+
+from elevenlabs import generate
+from VoiceProcessingToolkit.text_to_speech.elevenlabs_tts import ElevenLabsConfig
+
+from SemanthaVoiceAssistant.Config.functions_utils import strip_terminator
+
+# A sentence ends at ., ! or ? followed by whitespace, or at a blank line
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n\s*\n')
+MIN_SENTENCE_CHARS = 20  # Shorter fragments are merged with the next sentence to avoid choppy speech
+MPV_COMMAND = ["mpv", "--no-cache", "--no-terminal", "--", "fd://0"]
+
+
+def play_audio_stream(audio_chunks, cancel_token=None):
+    """
+    Plays streamed audio through mpv, as elevenlabs.stream does, but stops as soon as the turn is cancelled.
+
+    :param audio_chunks: Iterable of encoded audio chunks.
+    :param cancel_token: Optional CancellationToken; cancelling it kills the player mid-sentence.
+    """
+    player = subprocess.Popen(MPV_COMMAND, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL)
+    if cancel_token:
+        cancel_token.on_cancel(player.kill)
+    try:
+        for chunk in audio_chunks:
+            if cancel_token and cancel_token.cancelled:
+                break
+            if chunk:
+                player.stdin.write(chunk)
+                player.stdin.flush()
+        player.stdin.close()
+        player.wait()
+    except (BrokenPipeError, OSError):
+        pass  # The player was killed by a cancellation
+    finally:
+        if player.poll() is None:
+            player.kill()
+
+
+def speak_text(text, voice_id=None, eleven_labs_api_key=None, cancel_token=None):
+    """
+    Synthesises and plays the text with ElevenLabs streaming, stopping when the turn is cancelled.
+    """
+    if not text or (cancel_token and cancel_token.cancelled):
+        return
+    config = ElevenLabsConfig(api_key=eleven_labs_api_key or os.getenv('ELEVENLABS_API_KEY'), voice_id=voice_id)
+    audio_stream = generate(text=text, voice=config.voice_id, model=config.model_id,
+                            api_key=config.elevenlabs_api_key, stream=True)
+    play_audio_stream(audio_stream, cancel_token)
+
+
+class SentenceSplitter:
+    """
+    Accumulates streamed text chunks and returns complete, sanitised sentences.
+    """
+
+    def __init__(self, min_chars: int = MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, chunk: str) -> list:
+        self._buffer += chunk
+        sentences = []
+        while True:
+            match = SENTENCE_BOUNDARY.search(self._buffer, self.min_chars)
+            if not match:
+                return sentences
+            sentence = strip_terminator(self._buffer[:match.start()])
+            self._buffer = self._buffer[match.end():]
+            if sentence:
+                sentences.append(sentence)
+
+    def flush(self) -> str:
+        sentence = strip_terminator(self._buffer)
+        self._buffer = ""
+        return sentence
+
+
+def iter_sentences(chunks, min_chars: int = MIN_SENTENCE_CHARS):
+    """
+    Yields complete, sanitised sentences from an iterable of streamed text chunks.
+    """
+    splitter = SentenceSplitter(min_chars)
+    for chunk in chunks:
+        if chunk:
+            yield from splitter.feed(chunk)
+    last_sentence = splitter.flush()
+    if last_sentence:
+        yield last_sentence
+
+
+class StreamingSpeaker:
+    """
+    Speaks sentences in order on a background thread while more text is still being generated.
+
+    Records time-to-first-token and time-to-first-audio relative to the start of the turn. Cancelling the turn
+    stops the current sentence and drops the queued ones.
+    """
+
+    def __init__(self, voice_id=None, eleven_labs_api_key=None, cancel_token=None):
+        self.config = ElevenLabsConfig(api_key=eleven_labs_api_key or os.getenv('ELEVENLABS_API_KEY'),
+                                       voice_id=voice_id)
+        self.started_at = time.perf_counter()
+        self.first_token_at = None
+        self.first_audio_at = None
+        self.cancel_token = cancel_token
+        self._sentences = queue.Queue()
+        self._thread = threading.Thread(target=self._speak_loop, name="streaming-speaker", daemon=True)
+        self._thread.start()
+
+    def mark_token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def say(self, sentence: str):
+        self._sentences.put(sentence)
+
+    def _audio_chunks(self, sentence: str):
+        audio_stream = generate(text=sentence, voice=self.config.voice_id, model=self.config.model_id,
+                                api_key=self.config.elevenlabs_api_key, stream=True)
+        for chunk in audio_stream:
+            if chunk and self.first_audio_at is None:
+                self.first_audio_at = time.perf_counter()
+            yield chunk
+
+    def _speak_loop(self):
+        while True:
+            sentence = self._sentences.get()
+            if sentence is None:
+                return
+            if self.cancel_token and self.cancel_token.cancelled:
+                continue
+            try:
+                play_audio_stream(self._audio_chunks(sentence), self.cancel_token)
+            except Exception as e:
+                logging.error(f"Failed to stream sentence to speech: {e}")
+
+    def finish(self) -> dict:
+        """
+        Waits for every queued sentence to be spoken and returns the latency metrics in seconds.
+        """
+        self._sentences.put(None)
+        self._thread.join()
+        return {
+            "time_to_first_token": self.first_token_at - self.started_at if self.first_token_at else None,
+            "time_to_first_audio": self.first_audio_at - self.started_at if self.first_audio_at else None,
+        }
+
+
+def speak_streamed_response(chunks, voice_id=None, eleven_labs_api_key=None, cancel_token=None):
+    """
+    Speaks a streamed response sentence by sentence as the chunks arrive.
+
+    :param chunks: Iterable of text chunks, e.g. model tokens.
+    :param voice_id: The ID of the voice to use for speech synthesis.
+    :param eleven_labs_api_key: The API key for ElevenLabs, if not using the environment variable.
+    :param cancel_token: Optional CancellationToken; cancelling it stops generation and playback.
+    :return: A tuple of the full response text and the latency metrics.
+    """
+    speaker = StreamingSpeaker(voice_id=voice_id, eleven_labs_api_key=eleven_labs_api_key,
+                               cancel_token=cancel_token)
+    splitter = SentenceSplitter()
+    response = ""
+    for chunk in chunks:
+        if cancel_token and cancel_token.cancelled:
+            if hasattr(chunks, "close"):
+                chunks.close()
+            break
+        if not chunk:
+            continue
+        speaker.mark_token()
+        response += chunk
+        for sentence in splitter.feed(chunk):
+            speaker.say(sentence)
+    last_sentence = splitter.flush()
+    if last_sentence:
+        speaker.say(last_sentence)
+    metrics = speaker.finish()
+    logging.info(f"Streaming TTS metrics: {metrics}")
+    return strip_terminator(response), metrics
@@ -0,0 +1,254 @@
+import collections
+import logging
+import os
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from importlib import resources
+
+import numpy as np
+import pvcobra
+import pvporcupine
+import pyaudio
+from VoiceProcessingToolkit.transcription.whisper import WhisperTranscriber
+from VoiceProcessingToolkit.wake_word_detector.AudioStreamManager import AudioStream
+from VoiceProcessingToolkit.wake_word_detector.NotificationSoundManager import NotificationSoundManager
+
+from SemanthaVoiceAssistant.Config.endpointing import FRAME_LENGTH, SAMPLE_RATE, create_endpointer, seconds_to_frames
+
+MAX_WAIT_FOR_SPEECH = 8.0  # Seconds to wait for speech to start before giving up on the turn
+MAX_RECORDING_LENGTH = 60.0
+PARTIAL_AFTER_SILENCE = 0.3  # Seconds of silence after new speech that trigger a partial transcript
+MIN_PARTIAL_SPEECH = 0.3  # Seconds of speech needed before a partial transcript is worth requesting
+NOTIFICATION_SOUND = str(resources.files('VoiceProcessingToolkit.wake_word_detector.Wav_MP3').joinpath('notification.wav'))
+
+
+class VoiceCaptureSession:
+    """
+    Long-lived voice capture that stays open across turns.
+
+    The microphone stream, Porcupine wake-word engine, Cobra voice activity detector and Whisper client are created
+    once. Recording reads from the same stream as wake-word detection, so no audio is lost between detection and
+    recording. A short pre-roll ring buffer holds the audio just before speech starts, so the onset of the utterance
+    is kept. The end of the utterance is decided by a fixed or adaptive endpointer, see Config/endpointing.py.
+
+    Whisper has no streaming mode, so partial transcripts are made by transcribing the audio recorded so far
+    whenever the speaker pauses. When no speech follows the last pause, that partial is already the final
+    transcript and no further Whisper request is needed.
+    """
+
+    def __init__(self, wake_word="computer", sensitivity=0.5, voice_threshold=0.9, inactivity_limit=2.5,
+                 min_recording_length=3, preroll_seconds=0.5, use_wake_word=True, play_notification_sound=True,
+                 endpointing="fixed"):
+        start = time.perf_counter()
+        access_key = os.getenv('PICOVOICE_APIKEY')
+        self.voice_threshold = voice_threshold
+        self.endpointer = create_endpointer(endpointing, inactivity_limit=inactivity_limit,
+                                            min_recording_length=min_recording_length)
+        self.audio_stream = AudioStream(rate=SAMPLE_RATE, channels=1, _audio_format=pyaudio.paInt16,
+                                        frames_per_buffer=FRAME_LENGTH)
+        self.porcupine = pvporcupine.create(access_key=access_key, keywords=[wake_word],
+                                            sensitivities=[sensitivity]) if use_wake_word else None
+        self.vad = pvcobra.create(access_key=access_key)
+        self.transcriber = WhisperTranscriber()
+        self.notification_sound = NotificationSoundManager(NOTIFICATION_SOUND) if play_notification_sound else None
+        self.preroll = collections.deque(maxlen=seconds_to_frames(preroll_seconds))
+        self.setup_seconds = time.perf_counter() - start
+        self.last_turn_setup_seconds = None
+        self._partial_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="partial-transcription")
+        self._partial = None  # (voiced frames covered, future) of the latest partial transcript
+        self._voiced_frames = 0
+        self._wake_word_heard = False  # Set when the wake word interrupted a turn, so capture skips waiting for it
+        logging.info(f"Voice capture session ready in {self.setup_seconds:.2f}s")
+
+    def _read_frame(self):
+        frame = bytes(self.audio_stream.read())
+        samples = np.frombuffer(frame, dtype=np.int16)
+        if len(samples) != FRAME_LENGTH:
+            # A short read after an input overflow; pad it so the engines get a full frame
+            samples = np.pad(samples, (0, FRAME_LENGTH - len(samples)))
+            frame = samples.tobytes()
+        return frame, samples
+
+    def _wait_for_wake_word(self, stop=None):
+        while stop is None or not stop.is_set():
+            frame, samples = self._read_frame()
+            self.preroll.append(frame)
+            if self.porcupine.process(samples) >= 0:
+                logging.debug("Wake word detected")
+                if self.notification_sound:
+                    self.notification_sound.play()  # Non-blocking, the stream keeps being read meanwhile
+                return True
+        return False
+
+    def watch_for_wake_word(self, cancel_token, stop):
+        """
+        Cancels the turn if the wake word is heard before stop is set. Used while a turn is being answered;
+        the next capture then starts recording straight away.
+        """
+        if not self.porcupine:
+            return
+        if self._wait_for_wake_word(stop):
+            self._wake_word_heard = True
+            cancel_token.cancel("wake word")
+
+    def _transcribe_frames(self, frames, on_partial=None):
+        path = self._save_wav(frames)
+        try:
+            transcription = self.transcriber.transcribe_audio(path)
+        finally:
+            os.remove(path)
+        if transcription and on_partial:
+            try:
+                on_partial(transcription)
+            except Exception as e:
+                logging.error(f"Partial transcript handler failed: {e}")
+        return transcription
+
+    def _submit_partial(self, frames, on_partial):
+        future = self._partial_executor.submit(self._transcribe_frames, list(frames), on_partial)
+        self._partial = (self._voiced_frames, future)
+
+    def _record_utterance(self, on_partial=None):
+        """
+        Records from speech onset until the endpointer detects the end of speech. Returns the frames, or None if no
+        speech started in time.
+
+        With on_partial set, each pause after new speech starts a background transcription of the audio so far,
+        and on_partial is called with its text.
+        """
+        frames = []
+        speaking = False
+        waited_frames = 0
+        silent_frames = 0
+        while True:
+            frame, samples = self._read_frame()
+            voiced = self.vad.process(samples) > self.voice_threshold
+            if not speaking:
+                if not voiced:
+                    self.preroll.append(frame)
+                    self.endpointer.observe_background(samples)
+                    waited_frames += 1
+                    if waited_frames >= seconds_to_frames(MAX_WAIT_FOR_SPEECH):
+                        return None
+                    continue
+                speaking = True
+                frames = list(self.preroll)
+                self.endpointer.reset()
+            frames.append(frame)
+            if voiced:
+                self._voiced_frames += 1
+                silent_frames = 0
+            else:
+                silent_frames += 1
+            if (on_partial and silent_frames == seconds_to_frames(PARTIAL_AFTER_SILENCE)
+                    and self._voiced_frames >= seconds_to_frames(MIN_PARTIAL_SPEECH)
+                    and (self._partial is None or self._partial[0] < self._voiced_frames)):
+                self._submit_partial(frames, on_partial)
+            if self.endpointer.update(samples, voiced):
+                return frames
+            if len(frames) >= seconds_to_frames(MAX_RECORDING_LENGTH):
+                logging.info("Maximum recording length reached. Finalizing recording...")
+                return frames
+
+    @staticmethod
+    def _save_wav(frames) -> str:
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+            path = tmp.name
+        with wave.open(path, 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(SAMPLE_RATE)
+            wf.writeframes(b''.join(frames))
+        return path
+
+    def start_turn(self):
+        """
+        Resets per-turn state. This is all the setup a turn needs once the session is open.
+        """
+        start = time.perf_counter()
+        self.preroll.clear()
+        self._partial = None
+        self._voiced_frames = 0
+        self.last_turn_setup_seconds = time.perf_counter() - start
+
+    def capture(self, on_partial=None, on_wake_word=None):
+        """
+        Waits for the wake word (if enabled), records one utterance and returns its transcription.
+
+        Args:
+            on_partial (callable, optional): Called from a background thread with each partial transcript.
+            on_wake_word (callable, optional): Called when the wake word is detected.
+
+        Returns:
+            str or None: The transcription, or None if no valid recording was made.
+        """
+        self.start_turn()
+        if self.porcupine and not self._wake_word_heard:
+            if self._wait_for_wake_word():
+                # The pre-roll holds the wake word itself; only audio after it belongs to the utterance
+                self.preroll.clear()
+            if on_wake_word:
+                on_wake_word()
+        self._wake_word_heard = False
+        frames = self._record_utterance(on_partial)
+        if frames is None:
+            logging.debug("No speech detected after the wake word.")
+            return None
+        duration = len(frames) * FRAME_LENGTH / SAMPLE_RATE
+        if not self.endpointer.accepts(duration):
+            logging.debug(f"Recording of {duration:.2f} seconds has too little speech. Discarded.")
+            return None
+        if self._partial and self._partial[0] == self._voiced_frames:
+            # Nothing was said after the last partial, so it already holds the whole utterance
+            try:
+                transcription = self._partial[1].result()
+                if transcription:
+                    return transcription
+            except Exception as e:
+                logging.error(f"Partial transcription failed, transcribing the full recording: {e}")
+        return self._transcribe_frames(frames)
+
+    def close(self):
+        self._partial_executor.shutdown(wait=False)
+        if self.porcupine:
+            self.porcupine.delete()
+        self.vad.delete()
+        self.audio_stream.cleanup()
+
+
+def measure_setup_cost(runs=5):
+    """
+    Compares the per-turn setup cost of building a VoiceProcessingManager every turn with a persistent session.
+    """
+    from VoiceProcessingToolkit.VoiceProcessingManager import VoiceProcessingManager
+
+    per_turn_manager = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        vpm = VoiceProcessingManager.create_default_instance(
+            use_wake_word=True, play_notification_sound=True, wake_word="computer", min_recording_length=3,
+            inactivity_limit=2.5, sensitivity=0.5, voice_threshold=0.9,
+        )
+        per_turn_manager.append(time.perf_counter() - start)
+        vpm.wake_word_detector.cleanup()
+
+    session = VoiceCaptureSession()
+    per_turn_session = []
+    for _ in range(runs):
+        session.start_turn()
+        per_turn_session.append(session.last_turn_setup_seconds)
+    session.close()
+
+    print(f"Per-turn setup, new manager every turn: {np.median(per_turn_manager) * 1000:8.1f} ms")
+    print(f"One-off session setup:                  {session.setup_seconds * 1000:8.1f} ms")
+    print(f"Per-turn setup, persistent session:     {np.median(per_turn_session) * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    measure_setup_cost(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,48 @@
+"""
+Measures the startup cost that lazy web surfer construction removes.
+
+Each measurement runs in a fresh interpreter. The script reports how long importing Surfer_agent takes now, and
+how long building the surfer stack takes. Before the lazy change that construction ran on every import.
+
+Usage: python -m SemanthaVoiceAssistant.Function_calls.Web_surfer.Startup_benchmark [runs]
+"""
+import statistics
+import subprocess
+import sys
+
+MODULE = "SemanthaVoiceAssistant.Function_calls.Web_surfer.Surfer_agent"
+
+IMPORT_SNIPPET = f"""
+import time
+start = time.perf_counter()
+import {MODULE}
+print(time.perf_counter() - start)
+"""
+
+CONSTRUCTION_SNIPPET = f"""
+import time
+from dotenv import load_dotenv
+load_dotenv()
+import {MODULE} as surfer
+start = time.perf_counter()
+surfer.get_web_surfer_agents()
+print(time.perf_counter() - start)
+"""
+
+
+def time_snippet(snippet, runs):
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", snippet], capture_output=True, text=True, check=True)
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    import_seconds = time_snippet(IMPORT_SNIPPET, runs)
+    construction_seconds = time_snippet(CONSTRUCTION_SNIPPET, runs)
+    print(f"Median over {runs} runs")
+    print(f"Import Surfer_agent (lazy):             {import_seconds * 1000:8.1f} ms")
+    print(f"Surfer stack construction (first use):  {construction_seconds * 1000:8.1f} ms")
+    print(f"Import Surfer_agent (eager, before):    {(import_seconds + construction_seconds) * 1000:8.1f} ms")
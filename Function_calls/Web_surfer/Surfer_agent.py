@@ -1,5 +1,7 @@
 import os
 import tempfile
+import threading
+import time
 from datetime import datetime
 import autogen
 import requests
@@ -10,10 +12,26 @@ import fitz
 from dotenv import load_dotenv
 from openai import OpenAI
 
+from SemanthaVoiceAssistant.Assistant_setup.Conversation_memory import shared_conversation_memory
 from SemanthaVoiceAssistant.Config.Config_list import config_list
 
-load_dotenv()
-perplexity_apikey = os.getenv("PERPLEXITY_API_KEY")
+_surfer_agents = None
+_surfer_agents_lock = threading.Lock()
+_web_query_aborted = threading.Event()
+
+
+def abort_web_query():
+    """
+    Stops a running query_web at its next step. Each query resets the flag when it starts.
+    """
+    _web_query_aborted.set()
+
+
+def _abort_reply(recipient, messages=None, sender=None, config=None):
+    # Registered first on every surfer agent: once the query is aborted, no agent replies, so the chat ends
+    if _web_query_aborted.is_set():
+        return True, None
+    return False, None
 
 
 def fetch_and_read_pdf(url):
@@ -43,6 +61,7 @@ def fetch_and_read_pdf(url):
 
 def query_preplexity_with_message(user_message):
     # Get the API key from the environment variable
+    perplexity_apikey = os.getenv("PERPLEXITY_API_KEY")
 
     # Define the messages structure, including the system and user messages
     messages = [
@@ -163,10 +182,42 @@ def create_web_surfer_agent():
         },
         llm_config=llm_config
     )
+    # The surfer browses through an inner assistant/user proxy chat, so those agents check for an abort too
+    for agent in (surfer_agent, web_proxy_agent, surfer_agent._assistant, surfer_agent._user_proxy):
+        agent.register_reply([autogen.Agent, None], _abort_reply)
 
     return surfer_agent, web_proxy_agent
 
 
+def get_web_surfer_agents():
+    """
+    Returns the WebSurferAgent and UserProxyAgent, creating them on first use.
+
+    Building the stack creates a browser and clears the downloads folder, so it only happens once a session
+    actually browses.
+
+    Returns:
+        tuple: A tuple containing instances of WebSurferAgent and UserProxyAgent.
+    """
+    global _surfer_agents
+    with _surfer_agents_lock:
+        if _surfer_agents is None:
+            _surfer_agents = create_web_surfer_agent()
+        return _surfer_agents
+
+
+def prewarm_web_surfer():
+    """
+    Creates the web surfer stack on a background thread so the first query_web call does not pay for it.
+
+    Returns:
+        threading.Thread: The started prewarm thread.
+    """
+    thread = threading.Thread(target=get_web_surfer_agents, name="web-surfer-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
 def initiate_task(task_description, task_time, clear_chat_history=False):
     """
     Initiates a task with the WebSurferAgent at a specified time.
@@ -177,9 +228,17 @@ def initiate_task(task_description, task_time, clear_chat_history=False):
         clear_chat_history (bool): Whether to clear history before initiating the task.
     """
     formatted_task_description = f"{task_description}. Current time: {task_time.strftime('%Y-%m-%d %H:%M:%S')}"
+    web_surfer_agent, user_proxy_agent = get_web_surfer_agents()
+    if clear_chat_history:
+        shared_conversation_memory.reset(user_proxy_agent, web_surfer_agent)
+    else:
+        shared_conversation_memory.before_turn(user_proxy_agent, web_surfer_agent)
+    start = time.perf_counter()
     user_proxy_agent.initiate_chat(web_surfer_agent, message=formatted_task_description,
                                    clear_history=clear_chat_history, silent=False)
     latest_message_content = web_surfer_agent.last_message().get("content", "").strip()
+    shared_conversation_memory.after_turn(user_proxy_agent, web_surfer_agent, formatted_task_description,
+                                          latest_message_content, time.perf_counter() - start)
     return latest_message_content
 
 
@@ -192,6 +251,7 @@ def query_web(task_description_input, should_clear_history=False, copilot=None):
         should_clear_history (bool, optional): Whether to clear chat history before the task. Defaults to False.
         copilot (bool, optional): Whether to use Perplexity API for enhancing the query. Defaults to None.
     """
+    _web_query_aborted.clear()
     if should_clear_history:
         print("CLEARING HISTORY")
 
@@ -212,18 +272,21 @@ def query_web(task_description_input, should_clear_history=False, copilot=None):
         print(
             "BING_API environment variable not set. Please check https://www.microsoft.com/en-us/bing/apis/bing-web-search-api for more information.")
 
+    if _web_query_aborted.is_set():
+        return "RESULT: The web query was cancelled by the user."
     current_time = datetime.now()
     try:
         response = initiate_task(task_description_input, current_time, clear_chat_history=should_clear_history)
+        if _web_query_aborted.is_set():
+            return "RESULT: The web query was cancelled by the user."
         response_result = "RESULT:" + response
         return response_result
     except Exception as e:
         print(f"An error occurred while querying the web: {e}")
 
 
-web_surfer_agent, user_proxy_agent = create_web_surfer_agent()
-
 if __name__ == "__main__":
+    load_dotenv()
     while True:
         user_task_input = input("Type your input: ")
         query_web(user_task_input, should_clear_history=True, copilot=True)
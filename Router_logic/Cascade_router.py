@@ -0,0 +1,99 @@
+import logging
+import time
+
+import numpy as np
+
+from SemanthaVoiceAssistant.Router_logic.Local_encoder import HashedNgramEncoder
+from SemanthaVoiceAssistant.Router_logic.Route_index import RouteIndex
+
+CASCADE_CONFIG_KEY = "input_router_cascade"
+DEFAULT_CASCADE_CONFIG = {
+    "enabled": True,
+    "margin": 0.15,  # Minimum top-1/top-2 route score gap for the local stage to decide
+    "min_score": 0.45,  # Minimum top-1 score for the local stage to pick a route
+    # Top-1 scores below this are decided locally as 'no route'. Off by default: paraphrased commands score low on
+    # the hashed n-grams, so low-score turns escalate like other ambiguous ones
+    "none_score": 0.0,
+}
+
+
+class LocalRouteScorer:
+    """
+    Scores text against every route with the offline hashed n-gram encoder.
+
+    A route's score is the cosine similarity of its closest utterance.
+    """
+
+    def __init__(self, routes, encoder=None):
+        self.encoder = encoder or HashedNgramEncoder()
+        self.index = RouteIndex.from_routes(routes, self.encoder)
+        self.route_names = self.index.route_names
+
+    def score(self, text: str) -> np.ndarray:
+        return self.index.route_max_scores(self.encoder.encode_one(text))
+
+
+class CascadedRouter:
+    """
+    Two-stage router: the local scorer decides clear-cut turns, ambiguous turns escalate to the remote route layer.
+    """
+
+    def __init__(self, routes, remote_route, margin=0.15, min_score=0.45, none_score=0.0):
+        """
+        :param routes: The routes shared by both stages.
+        :param remote_route: Callable (text, turn_embedding) -> route name, used for low-margin turns.
+        :param margin: Minimum top-1/top-2 score gap for the local stage to decide.
+        :param min_score: Minimum top-1 score for the local stage to pick a route.
+        :param none_score: Top-1 scores below this are decided locally as no route; 0 escalates them instead.
+        """
+        self.local_scorer = LocalRouteScorer(routes)
+        self.remote_route = remote_route
+        self.margin = margin
+        self.min_score = min_score
+        self.none_score = none_score
+        self._turns = 0
+        self._escalations = 0
+        self._local_seconds = 0.0
+        self._remote_seconds = 0.0
+
+    def local_decision(self, text: str):
+        """
+        Return (decided, route_name) from the local stage alone.
+        """
+        scores = self.local_scorer.score(text)
+        order = np.argsort(scores)[::-1]
+        top = scores[order[0]]
+        runner_up = scores[order[1]] if len(order) > 1 else -1.0
+        if self.none_score and top < self.none_score:
+            return True, None
+        if top >= self.min_score and top - runner_up >= self.margin:
+            return True, self.local_scorer.route_names[order[0]]
+        return False, None
+
+    def __call__(self, text: str, turn_embedding=None):
+        self._turns += 1
+        start = time.perf_counter()
+        decided, route_name = self.local_decision(text)
+        self._local_seconds += time.perf_counter() - start
+        if decided:
+            logging.debug(f"Cascade decided locally: {route_name}")
+            return route_name
+
+        self._escalations += 1
+        start = time.perf_counter()
+        route_name = self.remote_route(text, turn_embedding)
+        self._remote_seconds += time.perf_counter() - start
+        logging.debug(f"Cascade escalated to the remote route layer: {route_name}")
+        return route_name
+
+    def stats(self) -> dict:
+        """
+        Escalation rate and mean stage latencies, for tuning the margin.
+        """
+        return {
+            "turns": self._turns,
+            "escalations": self._escalations,
+            "escalation_rate": self._escalations / self._turns if self._turns else 0.0,
+            "local_ms": self._local_seconds / self._turns * 1000 if self._turns else 0.0,
+            "remote_ms": self._remote_seconds / self._escalations * 1000 if self._escalations else 0.0,
+        }
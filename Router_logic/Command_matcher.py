@@ -0,0 +1,178 @@
+"""
+Lexical matcher for control commands.
+
+Usage: python -m SemanthaVoiceAssistant.Router_logic.Command_matcher
+evaluates the matcher on variants of the control commands and on near-miss sentences that must not match.
+"""
+import logging
+import time
+from collections import defaultdict
+
+from SemanthaVoiceAssistant.Router_logic.Text_normalisation import normalise_text
+
+# Routes whose wording is close to fixed, so they can be matched lexically
+CONTROL_ROUTES = ("change_input", "toggle_voice_feedback", "toggle_profile")
+
+
+def char_trigrams(text: str) -> set:
+    """
+    Character trigrams of each word, padded so word starts and ends count, e.g. 'feed' -> ' fe', 'fee', 'eed', 'ed '.
+    """
+    trigrams = set()
+    for word in text.split():
+        padded = f" {word} "
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+def dice(first: set, second: set) -> float:
+    return 2 * len(first & second) / (len(first) + len(second)) if first or second else 0.0
+
+
+class CommandMatcher:
+    """
+    Resolves control commands locally from a trigram index of their utterances, without any network call.
+
+    Exact normalised matches are a dictionary lookup. Otherwise the input is compared with every control utterance
+    that shares a trigram with it (Dice similarity of trigram sets), which tolerates transcription variants such as
+    'turn of speach'. The matcher only answers when the best route is both similar enough and clearly ahead of the
+    next one, and when the route's wording covers the whole input: every input word has to be close to a word of one
+    of its utterances, so a command inside a longer sentence ('let's try another profile pic') is not matched.
+    Everything else is left to the semantic router.
+    """
+
+    def __init__(self, routes, min_similarity=0.7, margin=0.15, min_word_similarity=0.4):
+        """
+        :param routes: The input router's routes; only the control routes are indexed.
+        :param min_similarity: Minimum Dice similarity to the closest utterance for a match.
+        :param margin: Minimum similarity gap between the best and second best route.
+        :param min_word_similarity: Minimum Dice similarity of every input word to a word of the route.
+        """
+        self.min_similarity = min_similarity
+        self.margin = margin
+        self.min_word_similarity = min_word_similarity
+        self.exact = {}
+        self.utterance_routes = []
+        self.utterance_trigrams = []
+        self.route_words = defaultdict(dict)  # route name -> {word: trigrams} of all its utterances
+        self.index = defaultdict(list)  # trigram -> ids of utterances containing it
+        for route in routes:
+            if route.name not in CONTROL_ROUTES:
+                continue
+            for utterance in route.utterances:
+                normalised = normalise_text(utterance)
+                self.exact[normalised] = route.name
+                utterance_id = len(self.utterance_routes)
+                self.utterance_routes.append(route.name)
+                trigrams = char_trigrams(normalised)
+                self.utterance_trigrams.append(trigrams)
+                self.route_words[route.name].update((word, char_trigrams(word)) for word in normalised.split())
+                for trigram in trigrams:
+                    self.index[trigram].append(utterance_id)
+        self.turns = 0
+        self.hits = 0
+        self._match_seconds = 0.0
+
+    def score(self, text: str) -> dict:
+        """
+        Return the best Dice similarity per control route for the text.
+        """
+        trigrams = char_trigrams(text)
+        shared = defaultdict(int)
+        for trigram in trigrams:
+            for utterance_id in self.index.get(trigram, ()):
+                shared[utterance_id] += 1
+        scores = {}
+        for utterance_id, count in shared.items():
+            similarity = 2 * count / (len(trigrams) + len(self.utterance_trigrams[utterance_id]))
+            route_name = self.utterance_routes[utterance_id]
+            scores[route_name] = max(scores.get(route_name, 0.0), similarity)
+        return scores
+
+    def covers(self, route_name: str, text: str) -> bool:
+        """
+        Whether every word of the text is close to a word of the route's utterances.
+        """
+        route_words = self.route_words[route_name].values()
+        return all(max(dice(char_trigrams(word), route_word) for route_word in route_words) >= self.min_word_similarity
+                   for word in text.split())
+
+    def _match(self, text: str):
+        normalised = normalise_text(text)
+        if normalised in self.exact:
+            return self.exact[normalised]
+        ranked = sorted(self.score(normalised).items(), key=lambda item: item[1], reverse=True)
+        if not ranked:
+            return None
+        best_route, best = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        if best >= self.min_similarity and best - runner_up >= self.margin and self.covers(best_route, normalised):
+            return best_route
+        return None
+
+    def match(self, text: str):
+        """
+        Return the control route for the text, or None when the semantic router has to decide.
+        """
+        start = time.perf_counter()
+        route_name = self._match(text)
+        self._match_seconds += time.perf_counter() - start
+        self.turns += 1
+        if route_name:
+            self.hits += 1
+            logging.debug(f"Command matcher resolved '{text}' to {route_name} without the network")
+        return route_name
+
+    def stats(self) -> dict:
+        """
+        How many turns skipped the semantic router, and the mean match time.
+        """
+        return {
+            "turns": self.turns,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.turns if self.turns else 0.0,
+            "match_us": self._match_seconds / self.turns * 1e6 if self.turns else 0.0,
+        }
+
+
+if __name__ == "__main__":
+    from SemanthaVoiceAssistant.Router_logic.Route_definitions import load_route_file, route_file_path
+
+    # Transcription variants of the control commands, and the route they should resolve to
+    COMMANDS = [
+        ("change input", "change_input"),
+        ("Change the input method.", "change_input"),
+        ("can we change the input", "change_input"),
+        ("chance input method", "change_input"),
+        ("toggle voice feedbak", "toggle_voice_feedback"),
+        ("turn off speech", "toggle_voice_feedback"),
+        ("turn of speach", "toggle_voice_feedback"),
+        ("toggle voice", "toggle_voice_feedback"),
+        ("Can we change the profile", "toggle_profile"),
+        ("lets try another profile", "toggle_profile"),
+        ("Let's try an other profile.", "toggle_profile"),
+    ]
+    # Everyday sentences close to a command's wording that must be left to the semantic router
+    NEAR_MISSES = [
+        "Let's try another profile pic",
+        "Can we change the profile picture on my account?",
+        "Let's try another profile of the customer",
+        "Can we change input prices in the model?",
+        "Change the input method of the parser",
+        "Change input voltage",
+        "Turn on speech recognition in the app",
+        "Turn off speech bubbles in the comic",
+        "Toggle voice feedback in my app's settings screen",
+        "Can we change the feedback form?",
+        "Try another profile picture",
+        "Changing inputs",
+    ]
+
+    matcher = CommandMatcher(load_route_file(route_file_path("input"))["routes"])
+    print(f"{'input':<52}{'expected':<24}{'matched':<24}{'score':>6}")
+    for text, expected in COMMANDS + [(text, None) for text in NEAR_MISSES]:
+        scores = matcher.score(normalise_text(text))
+        print(f"{text:<52}{str(expected):<24}{str(matcher.match(text)):<24}{max(scores.values(), default=0.0):>6.2f}")
+    recalled = sum(matcher.match(text) == expected for text, expected in COMMANDS)
+    false_matches = sum(matcher.match(text) is not None for text in NEAR_MISSES)
+    print(f"Commands matched: {recalled}/{len(COMMANDS)}, near misses matched: {false_matches}/{len(NEAR_MISSES)}")
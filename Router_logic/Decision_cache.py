@@ -0,0 +1,110 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from SemanthaVoiceAssistant.Router_logic.Text_normalisation import normalise_text
+
+_MISSING = object()
+
+
+def routes_signature(routes, encoder, index_options=None) -> str:
+    """
+    Hash of everything a routing decision depends on: the route names and utterances, the encoder model,
+    its dimensions, the score threshold and the route index storage options. Any change to the route definitions
+    gives a new signature.
+    """
+    dimensions = getattr(encoder, "dimensions", None)
+    definition = {
+        "encoder": encoder.name,
+        "dimensions": dimensions if isinstance(dimensions, int) else None,
+        "score_threshold": encoder.score_threshold,
+        "index": index_options or {},
+        "routes": [[route.name, list(route.utterances)] for route in routes],
+    }
+    return hashlib.sha256(json.dumps(definition, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class DecisionCache:
+    """
+    Bounded LRU cache of routing decisions, keyed by (router, route signature, normalised input text).
+
+    Entries expire after ttl_seconds. Because the key includes the route signature, decisions made with old
+    route definitions are never returned, and invalidate() drops them as soon as a router is rebuilt.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (stored_at, route name or None)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(router: str, signature: str, text: str) -> tuple:
+        return router, signature, normalise_text(text)
+
+    def get(self, router: str, signature: str, text: str):
+        """
+        Return (found, route_name). route_name may be None, which is a cached 'no route' decision.
+        """
+        key = self.key(router, signature, text)
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = _MISSING
+            if entry is _MISSING:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def put(self, router: str, signature: str, text: str, route_name):
+        key = self.key(router, signature, text)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), route_name)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_route(self, router: str, signature: str, text: str, route):
+        """
+        Return the cached decision for the text, or call route() and cache its result.
+
+        :param route: Zero-argument callable returning the route name; only called on a miss.
+        """
+        found, route_name = self.get(router, signature, text)
+        if not found:
+            route_name = route()
+            self.put(router, signature, text, route_name)
+        return route_name
+
+    def invalidate(self, router: str, keep_signature: str = None):
+        """
+        Drop a router's decisions, except those made with keep_signature (the current route definitions).
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == router and key[1] != keep_signature]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Shared by the input, research and sentiment routers
+shared_decision_cache = DecisionCache()
@@ -0,0 +1,178 @@
+import atexit
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+import numpy as np
+from semantic_router.encoders import BaseEncoder
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), ".embedding_cache")
+DEFAULT_MAX_ENTRIES = 2000  # Per (model, dimensions) namespace
+DEFAULT_MAX_NAMESPACES = 4  # Namespace files kept on disk, oldest are pruned first
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache shared by the routers.
+
+    Vectors are keyed by model name, dimensions and utterance text. Each (model, dimensions) pair lives in its own
+    namespace file, so a model or dimension change never serves stale vectors and old namespaces are pruned.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_namespaces: int = DEFAULT_MAX_NAMESPACES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_namespaces = max_namespaces
+        self._namespaces = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def namespace(model: str, dimensions) -> str:
+        return re.sub(r"[^A-Za-z0-9_.-]", "_", f"{model}-{dimensions}")
+
+    @staticmethod
+    def key(model: str, dimensions, text: str) -> str:
+        return hashlib.sha256(f"{model}\x00{dimensions}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, namespace: str) -> str:
+        return os.path.join(self.cache_dir, f"{namespace}.npz")
+
+    def _entries(self, model: str, dimensions) -> OrderedDict:
+        namespace = self.namespace(model, dimensions)
+        if namespace not in self._namespaces:
+            self._namespaces[namespace] = self._load(namespace, model, dimensions)
+        return self._namespaces[namespace]
+
+    def _load(self, namespace: str, model: str, dimensions) -> OrderedDict:
+        entries = OrderedDict()
+        path = self._path(namespace)
+        if not os.path.exists(path):
+            return entries
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if str(data["model"]) != model or str(data["dimensions"]) != str(dimensions):
+                    logging.info(f"Embedding cache '{path}' belongs to another model. Ignoring it.")
+                    return entries
+                for key, vector in zip(data["keys"], data["vectors"]):
+                    entries[str(key)] = vector
+        except (OSError, KeyError, ValueError) as e:
+            logging.error(f"Error reading embedding cache '{path}': {e}. Starting with an empty cache.")
+        return entries
+
+    def get_many(self, model: str, dimensions, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up cached vectors, returning None for every text that is not cached.
+        """
+        with self._lock:
+            entries = self._entries(model, dimensions)
+            vectors = []
+            for text in texts:
+                key = self.key(model, dimensions, text)
+                vector = entries.get(key)
+                if vector is not None:
+                    entries.move_to_end(key)
+                vectors.append(vector)
+            return vectors
+
+    def put_many(self, model: str, dimensions, texts: List[str], vectors) -> None:
+        with self._lock:
+            entries = self._entries(model, dimensions)
+            for text, vector in zip(texts, vectors):
+                entries[self.key(model, dimensions, text)] = np.asarray(vector, dtype=np.float32)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            self._dirty.add((model, str(dimensions)))
+
+    def flush(self) -> None:
+        """
+        Write namespaces with new entries to disk and prune the oldest namespace files.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for model, dimensions in self._dirty:
+                namespace = self.namespace(model, dimensions)
+                entries = self._namespaces[namespace]
+                tmp_path = self._path(namespace) + ".tmp.npz"
+                try:
+                    np.savez(
+                        tmp_path,
+                        model=np.array(model),
+                        dimensions=np.array(dimensions),
+                        keys=np.array(list(entries.keys()), dtype="<U64"),
+                        vectors=np.stack(list(entries.values())) if entries else np.zeros((0, 0), np.float32),
+                    )
+                    os.replace(tmp_path, self._path(namespace))
+                except OSError as e:
+                    logging.error(f"Error saving embedding cache '{namespace}': {e}")
+            self._dirty.clear()
+            self._prune_namespaces()
+
+    def _prune_namespaces(self) -> None:
+        files = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith(".npz")]
+        files.sort(key=os.path.getmtime, reverse=True)
+        for path in files[self.max_namespaces:]:
+            try:
+                os.remove(path)
+                logging.info(f"Pruned embedding cache namespace '{path}'")
+            except OSError as e:
+                logging.error(f"Failed to prune embedding cache '{path}': {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._namespaces.clear()
+            self._dirty.clear()
+            if os.path.isdir(self.cache_dir):
+                for name in os.listdir(self.cache_dir):
+                    if name.endswith(".npz"):
+                        os.remove(os.path.join(self.cache_dir, name))
+        logging.info("Embedding cache cleared.")
+
+
+shared_embedding_cache = EmbeddingCache()
+atexit.register(shared_embedding_cache.flush)
+
+
+class CachedEncoder(BaseEncoder):
+    """
+    Encoder wrapper that only sends utterances missing from the embedding cache to the wrapped encoder.
+    """
+    encoder: Any
+    cache: Any
+    dimensions: Any = None
+
+    def __init__(self, encoder: BaseEncoder, cache: Optional[EmbeddingCache] = None):
+        dimensions = getattr(encoder, "dimensions", None)
+        super().__init__(
+            name=encoder.name,
+            score_threshold=encoder.score_threshold,
+            type=encoder.type,
+            encoder=encoder,
+            cache=cache or shared_embedding_cache,
+            dimensions=dimensions if isinstance(dimensions, int) else None,
+        )
+
+    @property
+    def cache_dimensions(self):
+        return self.dimensions or "default"
+
+    def __call__(self, docs: List[Any]) -> List[List[float]]:
+        cached = self.cache.get_many(self.name, self.cache_dimensions, docs)
+        missing = list(dict.fromkeys(doc for doc, vector in zip(docs, cached) if vector is None))
+        if missing:
+            logging.debug(f"Embedding {len(missing)} of {len(docs)} documents with {self.name}")
+            fresh = dict(zip(missing, self.encoder(missing)))
+            self.cache.put_many(self.name, self.cache_dimensions, missing, fresh.values())
+        else:
+            fresh = {}
+        return [
+            np.asarray(fresh[doc] if vector is None else vector, dtype=np.float32).tolist()
+            for doc, vector in zip(docs, cached)
+        ]
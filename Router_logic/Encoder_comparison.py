@@ -0,0 +1,63 @@
+"""
+Compares the local encoder backend against the OpenAI encoder on the existing utterance sets.
+
+For every router, each utterance is routed by both backends. The script reports how often the local backend picks
+the same route as the OpenAI one, and the mean per-query routing latency (embedding plus scoring) of each backend.
+
+Usage: python -m SemanthaVoiceAssistant.Router_logic.Encoder_comparison
+"""
+import time
+
+from dotenv import load_dotenv
+
+from SemanthaVoiceAssistant.Router_logic.Research_router import Research_route_manager
+from SemanthaVoiceAssistant.Router_logic.RoutingManager import SemanticInputHandler
+from SemanthaVoiceAssistant.Router_logic.Sentiment_router import Sentiment_router
+
+ROUTERS = {
+    "input": SemanticInputHandler,
+    "research": Research_route_manager,
+    "sentiment": Sentiment_router,
+}
+
+
+def route_timed(router, text):
+    # Embed with the raw encoder so cached route utterances do not hide the real query latency
+    encoder = getattr(router.encoder, "encoder", router.encoder)
+    start = time.perf_counter()
+    vector = encoder([text])[0]
+    route_name = router.route_index(text, vector=vector).name
+    return route_name, time.perf_counter() - start
+
+
+def compare_router(router_class):
+    remote_router = router_class(encoder_backend="openai")
+    local_router = router_class(encoder_backend="local")
+    utterances = [utterance for route in remote_router.routes for utterance in route.utterances]
+
+    agreements = 0
+    remote_seconds = 0.0
+    local_seconds = 0.0
+    for utterance in utterances:
+        remote_route, remote_elapsed = route_timed(remote_router, utterance)
+        local_route, local_elapsed = route_timed(local_router, utterance)
+        agreements += remote_route == local_route
+        remote_seconds += remote_elapsed
+        local_seconds += local_elapsed
+
+    count = len(utterances)
+    return {
+        "utterances": count,
+        "agreement": agreements / count,
+        "openai_ms": remote_seconds / count * 1000,
+        "local_ms": local_seconds / count * 1000,
+    }
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    print(f"{'router':<12}{'utterances':>12}{'agreement':>12}{'openai ms':>12}{'local ms':>12}")
+    for name, router_class in ROUTERS.items():
+        result = compare_router(router_class)
+        print(f"{name:<12}{result['utterances']:>12}{result['agreement']:>12.1%}"
+              f"{result['openai_ms']:>12.2f}{result['local_ms']:>12.3f}")
@@ -0,0 +1,68 @@
+from semantic_router.encoders import OpenAIEncoder
+
+from SemanthaVoiceAssistant.Assistant_setup.ConfigManager import shared_config_manager
+from SemanthaVoiceAssistant.Router_logic.Embedding_cache import CachedEncoder
+from SemanthaVoiceAssistant.Router_logic.Local_encoder import HashedNgramEncoder
+
+OPENAI_EMBEDDING_MODEL = "text-embedding-3-large"
+ENCODER_BACKENDS_CONFIG_KEY = "router_encoder_backends"
+DEFAULT_ENCODER_BACKEND = "openai"
+ENCODER_BACKENDS = ("openai", "local")
+ROUTE_INDEX_CONFIG_KEY = "route_index_options"
+
+
+def get_routing_config(key: str, default=None, config_file_path: str = 'Config/config_file.json'):
+    """
+    Read a routing setting from the shared configuration manager of the config file.
+
+    :param key: The configuration key.
+    :param default: Value returned when the key is not set.
+    :param config_file_path: Path to the configuration file.
+    """
+    return shared_config_manager(config_file_path).get_config(key, default)
+
+
+def get_encoder_backend(router_name: str) -> str:
+    """
+    Read the encoder backend configured for a router from the config file.
+
+    :param router_name: The router key in the backend mapping, e.g. 'input', 'research' or 'sentiment'.
+    :return: The backend name, 'openai' unless configured otherwise.
+    """
+    backends = get_routing_config(ENCODER_BACKENDS_CONFIG_KEY, {})
+    return backends.get(router_name, DEFAULT_ENCODER_BACKEND)
+
+
+def get_route_index_options(router_name: str) -> dict:
+    """
+    Read the route index storage options configured for a router from the config file.
+
+    :param router_name: The router key in the options mapping, e.g. 'input', 'research' or 'sentiment'.
+    :return: Keyword arguments for RouteIndex.from_routes, e.g. {"precision": "int8", "dimensions": 1024}.
+        Empty (full precision, all dimensions) unless configured otherwise.
+    """
+    options = get_routing_config(ROUTE_INDEX_CONFIG_KEY, {})
+    return dict(options.get(router_name) or {})
+
+
+def create_encoder(backend: str, dimensions: int, score_thresholds: dict):
+    """
+    Create the route layer encoder for a backend.
+
+    :param backend: 'openai' for cached text-embedding-3-large vectors, 'local' for the offline hashed n-gram model.
+    :param dimensions: Embedding dimensions requested from the OpenAI encoder.
+    :param score_thresholds: Route score threshold per backend, as similarity scales differ between models.
+    """
+    if backend == "openai":
+        return CachedEncoder(
+            OpenAIEncoder(name=OPENAI_EMBEDDING_MODEL, dimensions=dimensions, score_threshold=score_thresholds[backend])
+        )  # Ensure your API key is set appropriately
+    if backend == "local":
+        return HashedNgramEncoder(score_threshold=score_thresholds[backend])
+    raise ValueError(f"Unknown encoder backend '{backend}'. Choose one of {ENCODER_BACKENDS}.")
+
+
+def flush_encoder_cache(encoder) -> None:
+    cache = getattr(encoder, "cache", None)
+    if cache is not None:
+        cache.flush()
@@ -0,0 +1,50 @@
+import re
+import zlib
+from typing import Any, List
+
+import numpy as np
+from semantic_router.encoders import BaseEncoder
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+class HashedNgramEncoder(BaseEncoder):
+    """
+    Offline CPU encoder that hashes word and character n-grams into a fixed-size, L2-normalised vector.
+
+    It needs no model download or network access and embeds a sentence in microseconds. Hashing uses crc32, so
+    vectors are stable across processes and can be cached or prebuilt.
+    """
+    name: str = "hashed-ngram"
+    score_threshold: float = 0.35
+    type: str = "local"
+    dimensions: int = 4096
+    char_ngram_range: tuple = (3, 5)
+    word_ngram_range: tuple = (1, 2)
+
+    def _features(self, text: str) -> List[str]:
+        words = TOKEN_PATTERN.findall(text.lower())
+        features = []
+        low, high = self.word_ngram_range
+        for n in range(low, high + 1):
+            features.extend("w:" + " ".join(words[i:i + n]) for i in range(len(words) - n + 1))
+        low, high = self.char_ngram_range
+        for word in words:
+            padded = f" {word} "
+            for n in range(low, high + 1):
+                features.extend("c:" + padded[i:i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def encode_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in self._features(text):
+            bucket = zlib.crc32(feature.encode("utf-8"))
+            # The high bit picks a sign so colliding features tend to cancel instead of piling up
+            vector[bucket % self.dimensions] += 1.0 if bucket & 0x80000000 else -1.0
+        # Sublinear term frequency keeps repeated n-grams from dominating the similarity
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def __call__(self, docs: List[Any]) -> List[List[float]]:
+        return [self.encode_one(str(doc)).tolist() for doc in docs]
@@ -1,179 +1,120 @@
+import logging
 import os
 
-from semantic_router.encoders import OpenAIEncoder
-from semantic_router import Route, RouteLayer
+from SemanthaVoiceAssistant.Config.file_watch import shared_file_watcher
+from SemanthaVoiceAssistant.Router_logic.Decision_cache import routes_signature, shared_decision_cache
+from SemanthaVoiceAssistant.Router_logic.Encoders import (
+    create_encoder, flush_encoder_cache, get_encoder_backend, get_route_index_options,
+)
+from SemanthaVoiceAssistant.Router_logic.Route_artifact import load_route_index
+from SemanthaVoiceAssistant.Router_logic.Route_definitions import (
+    RoutePrompt, RouteState, load_route_file, route_file_path,
+)
+from SemanthaVoiceAssistant.Router_logic.Route_index import DEFAULT_BATCH_SIZE, iter_chunks
 
 os.environ["OPENAI_MODEL_NAME"] = "text-embedding-3-large"
 
-# Define the system notes for each type of route as constants
-
-GENERAL_INFORMATION = """SYSTEM_NOTES: The user is initiating an inquiry into a topic, likely with minimal prior 
-understanding. Your response should serve as an introductory guide, offering a concise yet comprehensive overview. 
-Prioritize clarity and simplicity, avoiding technical jargon unless defined. Highlight key concepts and facts that 
-form the backbone of the topic, ensuring they are directly relevant to the user's query. Aim to pique the user's 
-interest with engaging content that invites further exploration. Your goal is to provide a foundational understanding 
-that empowers the user to pursue more in-depth knowledge if they choose."""
-
-SPECIFIC_DETAIL = """SYSTEM_NOTES: The user has requested information that hinges on specific details or facets of a 
-broader topic. Your response should be rich with exactness and precision. Ensure the accuracy of the information 
-provided, citing data or statistics to substantiate the claims when relevant. Place the detail within its larger 
-context to elucidate its relevance and impact on the topic as a whole. If the detail involves technical terms or 
-complex concepts, provide clear explanations to facilitate comprehension. The response should not only inform but 
-also deepen the user's understanding of the particular aspect in question."""
-
-COMPARATIVE_INFORMATION = """SYSTEM_NOTES: The user has posed a query that necessitates a comparative analysis. 
-Approach the response with a critical and analytical mindset, examining both similarities and differences. Ensure the 
-comparison is balanced, offering an impartial assessment that avoids bias. Provide evidence-based conclusions, 
-drawing from data, studies, or expert opinions to substantiate your analysis. Where possible, distill the information 
-into a conclusive summary or recommendation, aiding the user in decision-making or understanding the comparative 
-significance of each element involved. Your response should not only contrast the entities but also enlighten the 
-user on the broader implications of these comparisons."""
-
-HISTORICAL_INFORMATION = """SYSTEM_NOTES: The user seeks insight into the historical trajectory of a topic. Construct 
-a response that outlines the topic's evolution in a clear chronological order. Emphasize pivotal milestones, 
-discoveries, or figures that have significantly impacted the topic's direction. Explain the causal relationships 
-between historical events and their outcomes, shedding light on how past developments have laid the groundwork for 
-the present. Where relevant, bridge the historical narrative to modern-day implications, demonstrating the topic's 
-ongoing significance or legacy. Your response should not only recount history but also provide a lens through which 
-the user can understand the topic's current and potential future state."""
-
-PROCEDURAL_INFORMATION = """SYSTEM_NOTES: The user is seeking guidance on how to execute a task or understand a 
-procedure. Your response should serve as a practical manual, structured as a series of clear, actionable steps. Begin 
-with a brief introduction to the task at hand, then proceed with a sequential list of instructions, ensuring each 
-step is necessary and contributes to the completion of the task. Be comprehensive without overwhelming the user, 
-and maintain a level of simplicity in your language to accommodate a broad audience. Include tips or best practices 
-where applicable, and consider providing warnings for common mistakes or misconceptions. The objective is to empower 
-the user to perform the task independently and successfully with the information you provide."""
-
-PREDICTIVE_INFORMATION = """SYSTEM_NOTES: The user is looking forward to grasping potential developments within a 
-given topic. Frame your response with a forward-looking perspective, synthesizing current trends and data to outline 
-possible future scenarios. Incorporate insights from authoritative sources and experts to lend credibility to your 
-predictions. Present a spectrum of outcomes where applicable, from the most likely to less probable, to capture the 
-range of possibilities. Emphasize the speculative nature of predictions and clearly state any assumptions underlying 
-your forecast. The aim is to provide the user with a thoughtful, informed conjecture that sparks consideration and 
-prepares them for what might lie ahead."""
-
-PROBLEM_SOLVING = """SYSTEM_NOTES: The user is facing a challenge and seeks a solution or guidance to overcome it. 
-Approach your response with empathy and a focus on clarity. Offer practical, step-by-step advice tailored to the 
-user's specific problem, ensuring that each step is actionable and comprehensible. Anticipate potential obstacles or 
-common mistakes related to the problem and provide strategies to navigate or avoid them. Where appropriate, 
-supplement your advice with examples, analogies, or additional resources that the user might find helpful. The goal 
-is to empower the user with the knowledge and confidence to tackle their issue effectively, fostering a sense of 
-support and understanding."""
-
-# Map the system notes to the route names
-system_notes_mapping = {
-    'general_information': GENERAL_INFORMATION,
-    'specific_detail': SPECIFIC_DETAIL,
-    'comparative_information': COMPARATIVE_INFORMATION,
-    'historical_information': HISTORICAL_INFORMATION,
-    'procedural_information': PROCEDURAL_INFORMATION,
-    'predictive_information': PREDICTIVE_INFORMATION,
-    'problem_solving': PROBLEM_SOLVING
-}
+# Route score threshold per encoder backend
+RESEARCH_SCORE_THRESHOLDS = {"openai": 0.3, "local": 0.2}
 
 
 class Research_route_manager:
-    def __init__(self):
-        self.route_layer = None
-        self.routes = None
-        self.encoder = OpenAIEncoder(name="text-embedding-3-large", score_threshold=0.3)  # Ensure your API key is set appropriately
+    def __init__(self, encoder_backend=None, routes_file=None):
+        self.state = None
+        self.routes_file = routes_file or route_file_path("research")
+        self.encoder_backend = encoder_backend or get_encoder_backend("research")
+        self.encoder = create_encoder(self.encoder_backend, dimensions=3072, score_thresholds=RESEARCH_SCORE_THRESHOLDS)
         self.setup_routes()
+        # Edits to the route file are picked up while the assistant runs
+        shared_file_watcher.watch(self.routes_file, self.reload_routes)
 
     def setup_routes(self):
-
-        # 1. Specific Detail Requests
-        specific_detail_route = Route(
-            name="specific",
-            utterances=[
-                "What are the main causes of {specific consept} in {topic}?",
-                "How does {specifics} affect {topic}?",
-                "I need comprehensive information about {specific} in {topic}.",
-                "Can you break down the {specific} of {topic} for me?"
-            ]
-        )
-
-        # 2. Comparative Information Requests
-        comparative_info_route = Route(
-            name="comparative_information",
-            utterances=[
-                "Compare {topic1} and {topic2} for me.",
-                "What are the differences between {topic1} and {topic2}?",
-                "How is {topic1} similar to {topic2}?",
-                "I'm trying to understand how {topic1} and {topic2} relate to each other."
-            ]
-        )
-
-        # 3. Historical Information or Evolution
-        historical_info_route = Route(
-            name="historical_information",
-            utterances=[
-                "What is the history of {topic}?",
-                "How has {topic} evolved over time?",
-                "Trace the development of {topic}.",
-                "I want to understand the historical background of {topic}."
-            ]
-        )
-
-        # 4. Procedural or How-To Information
-        procedural_info_route = Route(
-            name="procedural_information",
-            utterances=[
-                "How do I {perform a task} in {topic}?",
-                "What are the steps for {performing a task} in {topic}?",
-                "Can you guide me through the process of {task} in {topic}?",
-                "I need a walkthrough on {task} in {topic}."
-            ]
-        )
-
-        # 5. Predictive or Future-Oriented Information
-        predictive_info_route = Route(
-            name="predictive_information",
-            utterances=[
-                "What are the future trends in {topic}?",
-                "How is {topic} expected to change in the future?",
-                "Predict the future of {topic}.",
-                "I'm curious about what's next for {topic}."
-            ]
-        )
-
-        # 6. Problem-Solving or Troubleshooting Information
-        problem_solving_route = Route(
-            name="problem_solving",
-            utterances=[
-                "How do I solve {problem} in {topic}?",
-                "I'm having trouble with {problem} in {topic}.",
-                "What are common solutions for {problem} in {topic}?",
-                "Guide me through troubleshooting {problem} in {topic}."
-            ]
-        )
-
-        # Initialize the RouteLayer with the defined routes
-        self.routes = [
-            specific_detail_route,
-            comparative_info_route,
-            historical_info_route,
-            procedural_info_route,
-            predictive_info_route,
-            problem_solving_route
-        ]
-
-        # Add more routes if needed
-        self.route_layer = RouteLayer(encoder=self.encoder, routes=self.routes)
-
-
-def create_full_prompt(question_analyzed, research_route_manager):
-    # Analyze the question to determine the route
-    route_choice = research_route_manager.route_layer(question_analyzed).name
-    print(f"Route chosen: {route_choice}")
-
-    # Fetch the system notes for the chosen route, default to GENERAL_INFORMATION if not found
-    system_notes = system_notes_mapping.get(route_choice, GENERAL_INFORMATION)
-
+        # The routes and their system notes are defined in Router_logic/Routes/research.json
+        definition = load_route_file(self.routes_file)
+        index_options = get_route_index_options("research")
+        # Only utterances missing from the route index artifact are embedded
+        route_index = load_route_index("research", definition["routes"], self.encoder, **index_options)
+        flush_encoder_cache(self.encoder)
+
+        signature = routes_signature(definition["routes"], self.encoder, index_options)
+        state = RouteState(definition["routes"], index_options, route_index, signature,
+                           definition["system_notes"], definition["default_system_notes"])
+
+        # The new state replaces the live one in a single assignment, so turns in flight keep routing meanwhile
+        self.state = state
+        shared_decision_cache.invalidate("research", keep_signature=signature)
+
+    @property
+    def routes(self):
+        return self.state.routes
+
+    @property
+    def route_index(self):
+        return self.state.route_index
+
+    def reload_routes(self, _path=None):
+        try:
+            self.setup_routes()
+            logging.info(f"Reloaded {len(self.routes)} research routes from '{self.routes_file}'")
+        except (OSError, ValueError) as e:
+            logging.error(f"Error reloading the research routes: {e}. Keeping the current routes.")
+
+    def system_notes_for(self, route_choice, state=None):
+        # Routes without their own notes get the default notes (general information)
+        return (state or self.state).system_notes_for(route_choice)
+
+    def route(self, question, turn_embedding=None, state=None):
+        """
+        Return the research route for the question. Repeated questions are answered from the shared decision cache,
+        so they need neither an embedding nor scoring.
+
+        :param state: Route state snapshot to use, so the caller can look up the notes from the same routes.
+        """
+        state = state or self.state
+
+        def route_with_index():
+            # Reuse the turn embedding when one is shared
+            vector = turn_embedding.for_encoder(self.encoder) if turn_embedding else None
+            return state.route_index(question, vector=vector).name
+
+        return shared_decision_cache.get_or_route("research", state.signature, question, route_with_index)
+
+    def route_batch(self, questions, state=None):
+        """
+        Route a list of questions with one encoder call and one scoring pass. The decision cache is bypassed.
+        """
+        # Embed with the raw encoder so a large corpus does not evict the route utterances from the embedding cache
+        encoder = getattr(self.encoder, "encoder", self.encoder)
+        vectors = encoder(list(questions))
+        return [choice.name for choice in (state or self.state).route_index.score_batch(vectors=vectors)]
+
+    def analyze_inputs(self, questions, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Route and build the prompt for many questions, e.g. logged turns, batch_size questions per encoder call.
+
+        :param questions: Any iterable of questions; it is read one batch at a time.
+        :param batch_size: Questions embedded per encoder call.
+        :return: Generator of (question, {"route": route name or None, "prompt": prompt}) in input order.
+        """
+        for chunk in iter_chunks(questions, batch_size):
+            state = self.state
+            for question, route_choice in zip(chunk, self.route_batch(chunk, state)):
+                prompt = full_prompt_for_route(question, state.system_notes_for(route_choice), route_choice)
+                yield question, {"route": route_choice, "prompt": prompt}
+
+
+def full_prompt_for_route(question_analyzed, system_notes, route_choice=None):
     # Construct the full prompt
-    full_prompt = f"Question: {question_analyzed}\n\n{system_notes}\n\nResponse:"
+    prompt = f"Question: {question_analyzed}\n\n{system_notes or ''}\n\nResponse:"
+    return RoutePrompt(prompt, route_choice, system_notes)
+
 
-    return full_prompt
+def create_full_prompt(question_analyzed, research_route_manager, turn_embedding=None):
+    # Analyze the question to determine the route; the notes come from the same route state
+    state = research_route_manager.state
+    route_choice = research_route_manager.route(question_analyzed, turn_embedding, state)
+    print(f"Route chosen: {route_choice}")
+    return full_prompt_for_route(question_analyzed, state.system_notes_for(route_choice), route_choice)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,201 @@
+"""
+Prebuilt route index artifacts.
+
+Each router's utterance vectors are stored as a normalised float32 .npy file next to a JSON manifest listing the
+route names, thresholds, the route id of every row and a hash of every utterance (with the encoder model and
+dimensions). At start-up the vectors are memory-mapped read-only instead of being embedded, so loading is
+near-instant and router processes on one host share the same pages.
+
+Artifacts are named after the router, encoder model and dimensions, so running a tool with another backend builds its
+own artifact instead of replacing the assistant's. Quantisation and truncation are applied when the index is loaded,
+so one float32 artifact serves every precision setting.
+
+When the route definitions no longer match the manifest, the artifact is rebuilt incrementally: rows whose
+utterance hash is unchanged are copied from the old artifact and only new or edited utterances are embedded.
+
+Usage: python -m SemanthaVoiceAssistant.Router_logic.Route_artifact [--force]
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from SemanthaVoiceAssistant.Router_logic.Embedding_cache import EmbeddingCache
+from SemanthaVoiceAssistant.Router_logic.Route_index import RouteIndex, normalise_rows
+
+ARTIFACT_VERSION = 1
+DEFAULT_ARTIFACT_DIR = os.path.join(os.path.dirname(__file__), ".route_index")
+
+
+def encoder_dimensions(encoder):
+    dimensions = getattr(encoder, "dimensions", None)
+    return dimensions if isinstance(dimensions, int) else "default"
+
+
+def describe_routes(routes, encoder) -> dict:
+    """
+    Everything a router's artifact has to match: the encoder, route names and thresholds, and per utterance its
+    route id and a hash of (model, dimensions, text).
+    """
+    dimensions = encoder_dimensions(encoder)
+    return {
+        "version": ARTIFACT_VERSION,
+        "encoder": encoder.name,
+        "dimensions": dimensions,
+        "route_names": [route.name for route in routes],
+        "thresholds": [route.score_threshold if route.score_threshold is not None else encoder.score_threshold
+                       for route in routes],
+        "owners": [i for i, route in enumerate(routes) for _ in route.utterances],
+        "utterances": [utterance for route in routes for utterance in route.utterances],
+        "utterance_hashes": [EmbeddingCache.key(encoder.name, dimensions, utterance)
+                             for route in routes for utterance in route.utterances],
+    }
+
+
+def artifact_key(router_name: str, encoder) -> str:
+    """
+    File name stem of a router's artifact for an encoder, e.g. 'input__text-embedding-3-large__256'.
+    """
+    model = re.sub(r"[^A-Za-z0-9_.-]+", "_", encoder.name)
+    return f"{router_name}__{model}__{encoder_dimensions(encoder)}"
+
+
+def _manifest_path(key: str, artifact_dir: str) -> str:
+    return os.path.join(artifact_dir, f"{key}.json")
+
+
+def read_artifact(router_name: str, encoder, artifact_dir: str = DEFAULT_ARTIFACT_DIR):
+    """
+    Return (manifest, memory-mapped vectors) for a router and encoder, or None when there is no readable artifact.
+    """
+    try:
+        with open(_manifest_path(artifact_key(router_name, encoder), artifact_dir), "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+        if manifest.get("version") != ARTIFACT_VERSION:
+            logging.info(f"Route index artifact for '{router_name}' has another version. Rebuilding it.")
+            return None
+        vectors = np.load(os.path.join(artifact_dir, manifest["vectors_file"]), mmap_mode="r")
+        if vectors.shape[0] != len(manifest["utterance_hashes"]):
+            logging.warning(f"Route index artifact for '{router_name}' is incomplete. Rebuilding it.")
+            return None
+        return manifest, vectors
+    except FileNotFoundError:
+        return None
+    except (OSError, KeyError, ValueError) as e:
+        logging.error(f"Error reading route index artifact for '{router_name}': {e}. Rebuilding it.")
+        return None
+
+
+def is_current(manifest: dict, definition: dict) -> bool:
+    return all(manifest.get(key) == value for key, value in definition.items())
+
+
+def build_artifact(router_name: str, routes, encoder, artifact_dir: str = DEFAULT_ARTIFACT_DIR, previous=None):
+    """
+    Write a router's artifact, reusing the rows of previous whose utterance hash is unchanged.
+
+    The vectors file is named after the content hash and written before the manifest is atomically replaced, so
+    processes still using the old artifact keep a consistent mapping.
+
+    :param previous: (manifest, vectors) of the existing artifact, or None to embed every utterance.
+    :return: (manifest, vectors); the vectors are memory-mapped, or held in memory if the artifact cannot be written.
+    """
+    definition = describe_routes(routes, encoder)
+    key = artifact_key(router_name, encoder)
+    hashes = definition["utterance_hashes"]
+    old_rows = {}
+    if previous is not None:
+        old_rows = {utterance_hash: row for row, utterance_hash in enumerate(previous[0]["utterance_hashes"])}
+    missing = [i for i, utterance_hash in enumerate(hashes) if utterance_hash not in old_rows]
+    embedded = normalise_rows(encoder([definition["utterances"][i] for i in missing])) if missing else None
+
+    dimensions = embedded.shape[1] if embedded is not None else previous[1].shape[1]
+    vectors = np.empty((len(hashes), dimensions), dtype=np.float32)
+    for i, utterance_hash in enumerate(hashes):
+        if utterance_hash in old_rows:
+            vectors[i] = previous[1][old_rows[utterance_hash]]
+    if missing:
+        vectors[missing] = embedded
+    logging.info(f"Built route index artifact for '{router_name}': {len(hashes) - len(missing)} rows reused, "
+                 f"{len(missing)} embedded")
+
+    signature = hashlib.sha256("".join(hashes).encode("utf-8")).hexdigest()[:16]
+    manifest = {**definition, "vectors_file": f"{key}__{signature}.npy", "built_at": time.time()}
+    try:
+        os.makedirs(artifact_dir, exist_ok=True)
+        vectors_path = os.path.join(artifact_dir, manifest["vectors_file"])
+        if not os.path.exists(vectors_path):
+            tmp_path = f"{vectors_path}.{os.getpid()}.tmp"
+            stored = open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=vectors.shape)
+            stored[:] = vectors
+            stored.flush()
+            del stored
+            os.replace(tmp_path, vectors_path)
+        manifest_path = _manifest_path(key, artifact_dir)
+        tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file)
+        os.replace(tmp_path, manifest_path)
+        _prune_vectors(key, artifact_dir, keep=manifest["vectors_file"])
+        return manifest, np.load(vectors_path, mmap_mode="r")
+    except OSError as e:
+        logging.error(f"Error writing route index artifact for '{router_name}': {e}. Using it from memory.")
+        return manifest, vectors
+
+
+def _prune_vectors(key: str, artifact_dir: str, keep: str):
+    # Only this router and encoder's old files; processes that still map one keep its pages until they unmap it
+    pattern = re.compile(re.escape(key) + r"__[0-9a-f]{16}\.npy")
+    for name in os.listdir(artifact_dir):
+        if pattern.fullmatch(name) and name != keep:
+            try:
+                os.remove(os.path.join(artifact_dir, name))
+            except OSError as e:
+                logging.error(f"Failed to prune route index artifact '{name}': {e}")
+
+
+def load_route_index(router_name: str, routes, encoder, artifact_dir: str = DEFAULT_ARTIFACT_DIR, rebuild=False,
+                     **index_options) -> RouteIndex:
+    """
+    Load a router's route index from its memory-mapped artifact, rebuilding what changed when it is stale.
+
+    :param router_name: Artifact name, e.g. 'input', 'research' or 'sentiment'.
+    :param routes: The router's current route definitions.
+    :param encoder: The router's encoder, used only for utterances missing from the artifact.
+    :param rebuild: Embed every utterance again, ignoring the existing artifact.
+    :param index_options: Storage options passed on to RouteIndex, e.g. precision and dimensions.
+    """
+    artifact = None if rebuild else read_artifact(router_name, encoder, artifact_dir)
+    if artifact is None or not is_current(artifact[0], describe_routes(routes, encoder)):
+        artifact = build_artifact(router_name, routes, encoder, artifact_dir, previous=artifact)
+    manifest, vectors = artifact
+    return RouteIndex(manifest["route_names"], manifest["utterances"], manifest["owners"], vectors,
+                      manifest["thresholds"], encoder=encoder, normalised=True, **index_options)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    from SemanthaVoiceAssistant.Router_logic.Research_router import Research_route_manager
+    from SemanthaVoiceAssistant.Router_logic.RoutingManager import SemanticInputHandler
+    from SemanthaVoiceAssistant.Router_logic.Sentiment_router import Sentiment_router
+
+    load_dotenv()
+    force = "--force" in sys.argv[1:]
+    print(f"{'router':<12}{'utterances':>12}{'dimensions':>12}{'size':>12}{'load':>12}")
+    for name, router_class in (("input", SemanticInputHandler), ("research", Research_route_manager),
+                               ("sentiment", Sentiment_router)):
+        router = router_class()
+        if force:
+            load_route_index(name, router.routes, router.encoder, rebuild=True)
+        start = time.perf_counter()
+        route_index = load_route_index(name, router.routes, router.encoder)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<12}{len(route_index.utterances):>12}{route_index.dimensions:>12}"
+              f"{route_index.nbytes / 1024:>9.1f}KiB{elapsed * 1000:>10.2f}ms")
@@ -0,0 +1,100 @@
+import json
+import os
+
+from semantic_router import Route
+
+ROUTES_DIR = os.path.join(os.path.dirname(__file__), "Routes")
+# Sent instead of a route's system notes while the same notes are already in the conversation
+SYSTEM_NOTES_REFERENCE = "SYSTEM NOTES: unchanged, the system notes given earlier in this conversation still apply."
+
+
+def route_file_path(router_name: str) -> str:
+    """
+    Path of a router's declarative route file, e.g. Router_logic/Routes/research.json.
+    """
+    return os.path.join(ROUTES_DIR, f"{router_name}.json")
+
+
+def load_route_file(path: str) -> dict:
+    """
+    Read a route file.
+
+    The file holds a "routes" list of {"name", "utterances", optional "score_threshold"} objects, and optionally
+    "system_notes" (route name -> notes added to the prompt) and "default_system_notes" (notes for any other route).
+
+    :return: {"routes": [Route, ...], "system_notes": dict, "default_system_notes": str or None}
+    :raises ValueError: If the file is not valid JSON or does not follow this layout.
+    :raises OSError: If the file cannot be read.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        try:
+            definition = json.load(file)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Route file '{path}' is not valid JSON: {e}") from e
+
+    routes = []
+    for entry in definition.get("routes", []):
+        if not isinstance(entry, dict):
+            raise ValueError(f"Route file '{path}' has a route that is not an object: {entry}")
+        utterances = entry.get("utterances")
+        if not entry.get("name") or not isinstance(utterances, list) or not utterances:
+            raise ValueError(f"Route file '{path}' has a route without a name or utterances: {entry}")
+        if not all(isinstance(utterance, str) and utterance.strip() for utterance in utterances):
+            raise ValueError(f"Route '{entry['name']}' in '{path}' has an empty or non-text utterance")
+        routes.append(Route(name=entry["name"], utterances=utterances, score_threshold=entry.get("score_threshold")))
+    if not routes:
+        raise ValueError(f"Route file '{path}' defines no routes")
+    if len({route.name for route in routes}) != len(routes):
+        raise ValueError(f"Route file '{path}' defines a route name more than once")
+
+    system_notes = definition.get("system_notes", {})
+    if not isinstance(system_notes, dict):
+        raise ValueError(f"'system_notes' in '{path}' must map route names to notes")
+    return {
+        "routes": routes,
+        "system_notes": system_notes,
+        "default_system_notes": definition.get("default_system_notes"),
+    }
+
+
+class RouteState:
+    """
+    Everything a router builds from its route file. A reload builds a new state and swaps it in with one assignment,
+    and a turn reads the state once, so it never mixes old and new routes, index, signature or cascade.
+    """
+
+    def __init__(self, routes, index_options, route_index, signature, system_notes=None, default_system_notes=None,
+                 command_matcher=None):
+        self.routes = routes
+        self.index_options = index_options
+        self.route_index = route_index
+        self.signature = signature
+        self.system_notes = system_notes or {}
+        self.default_system_notes = default_system_notes
+        self.command_matcher = command_matcher
+        self.cascade = None  # Set by the input router before the state is published
+
+    def system_notes_for(self, route_choice):
+        # Routes without their own notes get the default notes, which may be None
+        return self.system_notes.get(route_choice, self.default_system_notes)
+
+
+class RoutePrompt(str):
+    """
+    A prompt that remembers its route and the system notes pasted into it, so the notes can be swapped for a short
+    reference when the conversation already holds them.
+    """
+
+    def __new__(cls, text, route=None, system_notes=None):
+        prompt = super().__new__(cls, text)
+        prompt.route = route
+        prompt.system_notes = system_notes
+        return prompt
+
+    def with_notes_reference(self) -> str:
+        """
+        The prompt with its system notes replaced by SYSTEM_NOTES_REFERENCE, as a plain string.
+        """
+        if not self.system_notes:
+            return str(self)
+        return str.replace(self, self.system_notes, SYSTEM_NOTES_REFERENCE, 1)
@@ -0,0 +1,215 @@
+import numpy as np
+from semantic_router.schema import RouteChoice
+
+AGGREGATIONS = ("sum", "mean", "max")
+PRECISIONS = ("float32", "float16", "int8")
+DEFAULT_BATCH_SIZE = 256  # Texts per encoder call in batch classification
+
+
+def iter_chunks(items, size: int):
+    """
+    Yield lists of up to size items from any iterable, without reading it all into memory.
+    """
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def normalise_rows(matrix) -> np.ndarray:
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def quantise(matrix: np.ndarray, precision: str):
+    """
+    Store unit-length rows at a lower precision.
+
+    :return: (stored matrix, per-row scales). int8 rows are scaled symmetrically so their largest component maps to
+        127, and the scales turn them back into similarities; float32 and float16 need no scales (None).
+    """
+    if precision == "float32":
+        return matrix, None
+    if precision == "float16":
+        return matrix.astype(np.float16), None
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    return np.round(matrix / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+class RouteIndex:
+    """
+    In-process route index that scores with the same rules as semantic-router's RouteLayer.
+
+    All utterance vectors sit in one contiguous, row-normalised float32 matrix, so one query is a single
+    matrix-vector product and a batch of queries is a single matrix-matrix product. As in RouteLayer, the top_k
+    most similar utterances are grouped by route and each route's scores are aggregated ('sum' by default). The
+    route with the highest total wins. It is returned only if its best utterance score is above the route's
+    threshold.
+
+    For large embeddings the matrix can be made compact: precision stores it as float16 (half the memory) or int8
+    with a scale per utterance (a quarter), and dimensions keeps only the leading components of every vector.
+    text-embedding-3 vectors stay meaningful when truncated and renormalised. Queries are truncated to match.
+    """
+
+    def __init__(self, route_names, utterances, owners, vectors, thresholds, encoder=None, top_k=5,
+                 aggregation="sum", precision="float32", dimensions=None, normalised=False):
+        """
+        :param route_names: Route names; a route's id is its position in this list.
+        :param utterances: Utterance texts, one per row of vectors.
+        :param owners: Route id of each utterance.
+        :param vectors: Utterance embeddings, one row per utterance.
+        :param thresholds: Score threshold of each route.
+        :param encoder: Encoder for text queries; not needed when queries are vectors.
+        :param top_k: Number of closest utterances that vote, as in RouteLayer.
+        :param aggregation: How a route's votes combine: 'sum', 'mean' or 'max'.
+        :param precision: Storage type of the utterance matrix: 'float32', 'float16' or 'int8'.
+        :param dimensions: Keep only this many leading dimensions of every vector; None keeps them all.
+        :param normalised: The vectors already have unit length, so a float32 index can use them as they are,
+            e.g. a memory-mapped artifact, without a copy.
+        """
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f"Unsupported aggregation '{aggregation}'. Choose one of {AGGREGATIONS}.")
+        if top_k < 1:
+            raise ValueError(f"top_k needs to be >= 1, but was: {top_k}.")
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unsupported precision '{precision}'. Choose one of {PRECISIONS}.")
+        self.route_names = list(route_names)
+        self.utterances = list(utterances)
+        self.owners = np.asarray(owners, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not normalised or dimensions is not None:
+            vectors = normalise_rows(vectors[:, :dimensions])
+        self.matrix, self.scales = quantise(vectors, precision)
+        self.dimensions = self.matrix.shape[1]
+        self.precision = precision
+        self.thresholds = np.asarray(thresholds, dtype=np.float32)
+        self.encoder = encoder
+        self.top_k = min(top_k, len(self.utterances))
+        self.aggregation = aggregation
+
+    @classmethod
+    def from_routes(cls, routes, encoder, top_k=5, aggregation="sum", precision="float32", dimensions=None):
+        """
+        Encode the utterances of the routes with the encoder in one batch and index them.
+        """
+        utterances = [utterance for route in routes for utterance in route.utterances]
+        owners = [i for i, route in enumerate(routes) for _ in route.utterances]
+        thresholds = [route.score_threshold if route.score_threshold is not None else encoder.score_threshold
+                      for route in routes]
+        return cls([route.name for route in routes], utterances, owners, encoder(utterances), thresholds,
+                   encoder=encoder, top_k=top_k, aggregation=aggregation, precision=precision,
+                   dimensions=dimensions)
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def encode(self, texts) -> np.ndarray:
+        if self.encoder is None:
+            raise ValueError("This route index has no encoder; pass query vectors instead of text.")
+        return np.asarray(self.encoder(list(texts)), dtype=np.float32)
+
+    def similarities(self, vectors) -> np.ndarray:
+        """
+        Cosine similarity of each query (one per row) to every utterance.
+        """
+        queries = normalise_rows(np.atleast_2d(np.asarray(vectors, dtype=np.float32))[:, :self.dimensions])
+        if self.precision == "float32":
+            return queries @ self.matrix.T
+        # NumPy has no fast half or int8 matrix product, so the compact matrix is widened for the product
+        similarities = queries @ self.matrix.T.astype(np.float32)
+        if self.scales is not None:
+            similarities *= self.scales
+        return similarities
+
+    def classify(self, similarities):
+        """
+        Apply the RouteLayer rules to a batch of utterance similarities.
+
+        :return: (route ids, best scores, passed), one per query. A query whose top route misses its threshold
+            has passed False.
+        """
+        similarities = np.atleast_2d(similarities)
+        queries = np.arange(similarities.shape[0])[:, None]
+        top = np.argpartition(similarities, -self.top_k, axis=1)[:, -self.top_k:]
+        top_scores = similarities[queries, top]
+        top_owners = self.owners[top]
+
+        shape = (similarities.shape[0], len(self.route_names))
+        rows = np.broadcast_to(queries, top.shape)
+        votes = np.zeros(shape, dtype=np.int32)
+        np.add.at(votes, (rows, top_owners), 1)
+        best = np.full(shape, -np.inf, dtype=np.float32)
+        np.maximum.at(best, (rows, top_owners), top_scores)
+        if self.aggregation == "max":
+            totals = best.copy()
+        else:
+            totals = np.zeros(shape, dtype=np.float32)
+            np.add.at(totals, (rows, top_owners), top_scores)
+            if self.aggregation == "mean":
+                totals = np.divide(totals, votes, out=totals, where=votes > 0)
+        totals[votes == 0] = -np.inf  # Routes without a vote in the top_k cannot win
+
+        route_ids = np.argmax(totals, axis=1)
+        best_scores = best[queries[:, 0], route_ids]
+        passed = best_scores > self.thresholds[route_ids]
+        return route_ids, best_scores, passed
+
+    def _choices(self, route_ids, best_scores, passed) -> list:
+        return [
+            RouteChoice(name=self.route_names[route_id], similarity_score=float(score)) if ok else RouteChoice()
+            for route_id, score, ok in zip(route_ids, best_scores, passed)
+        ]
+
+    def __call__(self, text=None, vector=None) -> RouteChoice:
+        """
+        Route one query, like RouteLayer.__call__. A precomputed vector skips encoding the text.
+        """
+        if vector is None:
+            if text is None:
+                raise ValueError("Either text or vector must be provided")
+            vector = self.encode([text])[0]
+        return self._choices(*self.classify(self.similarities(np.asarray(vector)[None, :])))[0]
+
+    def score_batch(self, texts=None, vectors=None) -> list:
+        """
+        Route many queries with one encoder call and one matrix-matrix product.
+
+        :return: A RouteChoice per query, in order.
+        """
+        if vectors is None:
+            if texts is None:
+                raise ValueError("Either texts or vectors must be provided")
+            vectors = self.encode(texts)
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        return self._choices(*self.classify(self.similarities(vectors)))
+
+    def route_max_scores(self, vector) -> np.ndarray:
+        """
+        Each route's best utterance similarity over all utterances, not just the top_k.
+        """
+        similarities = self.similarities(np.asarray(vector)[None, :])[0]
+        scores = np.full(len(self.route_names), -1.0, dtype=np.float32)
+        np.maximum.at(scores, self.owners, similarities)
+        return scores
+
+    def top_matches(self, text=None, vector=None, k=5) -> list:
+        """
+        The k closest utterances with their routes and scores, best first, for diagnostics.
+        """
+        if vector is None:
+            vector = self.encode([text])[0]
+        similarities = self.similarities(np.asarray(vector)[None, :])[0]
+        order = np.argsort(similarities)[::-1][:k]
+        return [
+            {"route": self.route_names[self.owners[i]], "utterance": self.utterances[i],
+             "score": float(similarities[i])}
+            for i in order
+        ]
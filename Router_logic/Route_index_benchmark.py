@@ -0,0 +1,70 @@
+"""
+Microbenchmark of the NumPy route index against semantic-router's RouteLayer.
+
+For every router, the utterances are embedded once, and the embeddings are used as queries so only the scoring
+path is timed. The script reports how often both paths pick the same route, and the mean time per query of
+RouteLayer, of RouteIndex one query at a time, and of RouteIndex scoring the whole set as one batch.
+
+Usage: python -m SemanthaVoiceAssistant.Router_logic.Route_index_benchmark [local|openai]
+"""
+import sys
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+from semantic_router import RouteLayer
+
+from SemanthaVoiceAssistant.Router_logic.Research_router import Research_route_manager
+from SemanthaVoiceAssistant.Router_logic.RoutingManager import SemanticInputHandler
+from SemanthaVoiceAssistant.Router_logic.Sentiment_router import Sentiment_router
+
+ROUTERS = {
+    "input": SemanticInputHandler,
+    "research": Research_route_manager,
+    "sentiment": Sentiment_router,
+}
+REPEATS = 5
+
+
+def time_per_query(route, vectors) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        for vector in vectors:
+            route(vector)
+    return (time.perf_counter() - start) / (REPEATS * len(vectors))
+
+
+def benchmark_router(router_class, encoder_backend=None) -> dict:
+    router = router_class(encoder_backend=encoder_backend)
+    route_layer = RouteLayer(encoder=router.encoder, routes=router.routes)
+    route_index = router.route_index
+    utterances = route_index.utterances
+    vectors = np.asarray(router.encoder(utterances), dtype=np.float32)
+
+    layer_routes = [route_layer(vector=vector).name for vector in vectors]
+    index_routes = [choice.name for choice in route_index.score_batch(vectors=vectors)]
+    agreement = sum(a == b for a, b in zip(layer_routes, index_routes)) / len(vectors)
+
+    layer_seconds = time_per_query(lambda vector: route_layer(vector=vector), vectors)
+    index_seconds = time_per_query(lambda vector: route_index(vector=vector), vectors)
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        route_index.score_batch(vectors=vectors)
+    batch_seconds = (time.perf_counter() - start) / (REPEATS * len(vectors))
+    return {
+        "utterances": len(vectors),
+        "agreement": agreement,
+        "route_layer_us": layer_seconds * 1e6,
+        "route_index_us": index_seconds * 1e6,
+        "batch_us": batch_seconds * 1e6,
+    }
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    backend = sys.argv[1] if len(sys.argv) > 1 else None
+    print(f"{'router':<12}{'utterances':>12}{'agreement':>12}{'RouteLayer':>14}{'RouteIndex':>14}{'batch':>12}")
+    for name, router_class in ROUTERS.items():
+        result = benchmark_router(router_class, backend)
+        print(f"{name:<12}{result['utterances']:>12}{result['agreement']:>12.1%}{result['route_layer_us']:>12.1f}us"
+              f"{result['route_index_us']:>12.1f}us{result['batch_us']:>10.2f}us")
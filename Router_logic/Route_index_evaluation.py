@@ -0,0 +1,93 @@
+"""
+Evaluates compact route index options against the full-precision index for every router.
+
+The queries are the utterances of all three routers, plus the lines of an optional text file of logged turns. Each
+router sees its own utterances as well as the other routers' utterances, so near-threshold and 'no route' inputs are
+also covered. For each precision and dimension setting the script reports the memory used by the utterance matrix,
+the mean scoring time per query, and how often the compact index picks the same route as the float32 index with
+all dimensions.
+
+Usage: python -m SemanthaVoiceAssistant.Router_logic.Route_index_evaluation [local|openai] [queries.txt]
+"""
+import sys
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from SemanthaVoiceAssistant.Router_logic.Research_router import Research_route_manager
+from SemanthaVoiceAssistant.Router_logic.Route_index import RouteIndex
+from SemanthaVoiceAssistant.Router_logic.RoutingManager import SemanticInputHandler
+from SemanthaVoiceAssistant.Router_logic.Sentiment_router import Sentiment_router
+
+ROUTERS = {
+    "input": SemanticInputHandler,
+    "research": Research_route_manager,
+    "sentiment": Sentiment_router,
+}
+# (precision, dimensions); None keeps every dimension
+INDEX_OPTIONS = [
+    ("float32", None),
+    ("float16", None),
+    ("int8", None),
+    ("float32", 1024),
+    ("float16", 1024),
+    ("int8", 1024),
+    ("int8", 512),
+    ("int8", 256),
+]
+REPEATS = 5
+
+
+def read_queries(path=None) -> list:
+    if not path:
+        return []
+    with open(path, encoding="utf-8") as file:
+        return [line.strip() for line in file if line.strip()]
+
+
+def time_per_query(route_index, vectors) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        for vector in vectors:
+            route_index(vector=vector)
+    return (time.perf_counter() - start) / (REPEATS * len(vectors))
+
+
+def evaluate_router(router, queries) -> list:
+    encoder = getattr(router.encoder, "encoder", router.encoder)
+    vectors = np.asarray(encoder(queries), dtype=np.float32)
+    full_dimensions = vectors.shape[1]
+    reference = None
+    results = []
+    for precision, dimensions in INDEX_OPTIONS:
+        if dimensions is not None and dimensions >= full_dimensions:
+            continue
+        route_index = RouteIndex.from_routes(router.routes, router.encoder, precision=precision,
+                                             dimensions=dimensions)
+        routes = [choice.name for choice in route_index.score_batch(vectors=vectors)]
+        if reference is None:
+            reference = routes
+        results.append({
+            "precision": precision,
+            "dimensions": route_index.dimensions,
+            "kib": route_index.nbytes / 1024,
+            "score_us": time_per_query(route_index, vectors) * 1e6,
+            "agreement": sum(a == b for a, b in zip(routes, reference)) / len(routes),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    backend = sys.argv[1] if len(sys.argv) > 1 else None
+    routers = {name: router_class(encoder_backend=backend) for name, router_class in ROUTERS.items()}
+    all_queries = [utterance for router in routers.values()
+                   for route in router.routes for utterance in route.utterances]
+    all_queries = list(dict.fromkeys(all_queries + read_queries(sys.argv[2] if len(sys.argv) > 2 else None)))
+
+    print(f"{'router':<12}{'precision':>10}{'dimensions':>12}{'memory':>12}{'score':>12}{'agreement':>12}")
+    for name, router in routers.items():
+        for result in evaluate_router(router, all_queries):
+            print(f"{name:<12}{result['precision']:>10}{result['dimensions']:>12}{result['kib']:>9.1f}KiB"
+                  f"{result['score_us']:>10.1f}us{result['agreement']:>12.1%}")
@@ -0,0 +1,49 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# One worker per router, so all of them encode their routes concurrently
+_warmup_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="router-warmup")
+
+
+class LazyRouter:
+    """
+    Builds a router on first use, or ahead of time on the background warm-up pool.
+
+    Callers that need the router before it is ready block only on that router.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._future = None
+        self._lock = threading.Lock()
+
+    def warm_up(self) -> Future:
+        with self._lock:
+            if self._future is None:
+                self._future = _warmup_executor.submit(self.factory)
+            return self._future
+
+    def get(self):
+        future = self.warm_up()
+        try:
+            return future.result()
+        except Exception:
+            # Forget the failed build so the next turn retries it
+            with self._lock:
+                if self._future is future:
+                    self._future = None
+            raise
+
+    @property
+    def ready(self) -> bool:
+        return self._future is not None and self._future.done()
+
+
+def warm_up_routers(*routers: LazyRouter) -> None:
+    """
+    Start building the given routers in the background without waiting for them.
+    """
+    for router in routers:
+        router.warm_up()
+    logging.debug(f"Warming up {len(routers)} routers in the background")
@@ -1,148 +1,315 @@
 import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from semantic_router import Route, RouteLayer
-from semantic_router.encoders import OpenAIEncoder
-
+from SemanthaVoiceAssistant.Config.file_watch import shared_file_watcher
 from SemanthaVoiceAssistant.Config.log_config import get_logger
+from SemanthaVoiceAssistant.Router_logic.Cascade_router import CASCADE_CONFIG_KEY, DEFAULT_CASCADE_CONFIG, CascadedRouter
+from SemanthaVoiceAssistant.Router_logic.Command_matcher import CommandMatcher
+from SemanthaVoiceAssistant.Router_logic.Decision_cache import routes_signature, shared_decision_cache
+from SemanthaVoiceAssistant.Router_logic.Encoders import (
+    create_encoder, flush_encoder_cache, get_encoder_backend, get_route_index_options, get_routing_config,
+)
 from SemanthaVoiceAssistant.Router_logic.Research_router import Research_route_manager, create_full_prompt
+from SemanthaVoiceAssistant.Router_logic.Route_artifact import load_route_index
+from SemanthaVoiceAssistant.Router_logic.Route_definitions import RouteState, load_route_file, route_file_path
+from SemanthaVoiceAssistant.Router_logic.Route_index import DEFAULT_BATCH_SIZE, iter_chunks
+from SemanthaVoiceAssistant.Router_logic.Router_warmup import LazyRouter
 from SemanthaVoiceAssistant.Router_logic.Sentiment_router import create_sentiment_prompt, Sentiment_router
+from SemanthaVoiceAssistant.Router_logic.Speculative_routing import RouteSpeculation
+from SemanthaVoiceAssistant.Router_logic.Turn_embedding import TurnEmbedding
 
 os.environ["OPENAI_MODEL_NAME"] = "text-embedding-3-large"
 
 logger = get_logger(log_level='ERROR')
 
-Prompt_manager = Research_route_manager()
-Sentiment_manager = Sentiment_router()
+# Route score threshold per encoder backend
+INPUT_SCORE_THRESHOLDS = {"openai": 0.51, "local": 0.35}
+
+# Action taken for each input route; anything else is a normal conversation turn
+ROUTE_ACTIONS = {
+    "change_input": "toggle_input_mode",
+    "Research": "start_research",
+    "toggle_voice_feedback": "toggle_voice_feedback",
+    "request_information": "request_information",
+    "toggle_profile": "toggle_profile",
+}
+
+# Built lazily so importing this module never encodes routes; main.py warms them up in the background
+Prompt_manager = LazyRouter(Research_route_manager)
+Sentiment_manager = LazyRouter(Sentiment_router)
+
+CONVERSATION_ACTIONS = ("request_information", "none")
+# Scores the research and sentiment layers while the input router runs on the caller's thread
+_parallel_routing_executor = ThreadPoolExecutor(max_workers=len(CONVERSATION_ACTIONS),
+                                                thread_name_prefix="parallel-routing")
 
 
 class SemanticInputHandler:
-    def __init__(self):
-        self.route_layer = None
-        self.routes = None
+    def __init__(self, encoder_backend=None, routes_file=None):
+        self.state = None
+        self.routes_file = routes_file or route_file_path("input")
         # IMPORTANT: Do not hardcode API keys here. Use environment variables or secure storage instead.
-        self.encoder = OpenAIEncoder(name="text-embedding-3-large", dimensions=256, score_threshold=0.51)  # Ensure your API key is set appropriately
+        self.encoder_backend = encoder_backend or get_encoder_backend("input")
+        self.encoder = create_encoder(self.encoder_backend, dimensions=256, score_thresholds=INPUT_SCORE_THRESHOLDS)
+        self.speculation = RouteSpeculation(self.speculate)
         self.setup_routes()
+        # Edits to the route file are picked up while the assistant runs
+        shared_file_watcher.watch(self.routes_file, self.reload_routes)
 
     def setup_routes(self):
-        # Define routes that trigger input mode changes
-        change_input = Route(
-            name="change_input",
-            utterances=[
-                "Change input method",
-                "Change input",
-                "Change the input method",
-                "Can we change input"
-            ],
-        )
-
-        toggle_profile = Route(
-            name="toggle_profile",
-            utterances=[
-                "Change the system settings to toggle a profile",
-                "Can we change the profile?",
-                "Let's try another profile",
-            ],
-        )
-
-        toggle_voice_feedback = Route(
-            name="toggle_voice_feedback",
-            utterances=[
-                "Toggle voice feedback",
-                "toggle of voice",
-                "turn of speech",
-                "toggle on voice",
-                "turn on speach",
-                "change the feedback method"
-                "Change feedback"
-            ],
-        )
-
-        request_router = Route(
-            name="request_information",
-            utterances=[
-                "ok go ahead and in detail, explain the consept"
-                "In detail, I need detailed information about <topic>.",
-                "In detail, Can you provide an in-depth analysis of <company> and its CEO?",
-                "In detail, Tell me more about the history and development of <technology>.",
-                "In detail, I'm looking for a comprehensive overview of <company>'s market strategy.",
-                "In detail, Explore the major milestones and future prospects of <technology>.",
-                "In detail, Dissect the key elements and current research in <field>.",
-                "In detail, I need a thorough breakdown of the market for <product>, including all critical aspects.",
-                "In detail, Examine the evolution, current status, and contributions of <company> in <industry>.",
-                "In detail, Provide a detailed historical context and analysis of <topic>.",
-                "In detail, Unpack the complexities and main debates surrounding <current issue>.",
-                "In detail, Conduct an extensive examination of <topic>, highlighting notable developments.",
-                "In detail, I'm interested in a deep dive into the history and implications of <topic>.",
-                "In detail, Compile a comprehensive report on the advancements in <field>, including major "
-                "contributors and"
-                "developments.",
-                "In detail: Delve into an in-depth exploration of <technology>, considering its impact and future "
-                "prospects.",
-                "In detail, Analyze the current trends and future outlook of <industry>.",
-                "In detail, Investigate the role and influence of <topic> in <context>.",
-                "In detail, Detail the journey and breakthroughs in <field> over the last decade.",
-                "In detail, Study the effects of <global issue> on <industry or topic>.",
-                "In detail, Dissect recent advancements and the future potential of <technology>.",
-                "In detail, Elaborate on the principles of <concept> and their application in <field>.",
-                "In detail, Can you research more in-depth on the series you mentioned?",
-                "In detail, Dig into the history of <topic>.",
-                "In detail, I need insights on <current event or trend>.",
-                "In detail, Explore the concept of <topic> further.",
-                "In detail, Delve into the roots and development of <topic>.",
-                "In detail, Shed light on <historical event or figure>.",
-                "In detail, Uncover details about <recent discovery or innovation>.",
-                "In detail, Analyze the data from <recent event or trend>.",
-                "In detail, Break down the plot and themes of <book or movie>.",
-                "In detail, Explain the theory behind <scientific concept>.",
-                "In detail, Detail the workings and implications of <technology or system>.",
-                "In detail, Survey the latest developments in <field or industry>.",
-                "In detail, Profile the life and impact of <historical or influential figure>.",
-                "In detail, Review the implications of <recent development or change> in <field or society>.",
-                "In detail, Summarize the key points of <complex topic or event>.",
-                "In detail, Clarify the steps and findings of <recent study or experiment>.",
-                "In detail, Describe the features and impact of <new technology or update>.",
-                "In detail, Illustrate the concept and significance of <philosophical theory or idea>.",
-                "In detail, Trace the origins and evolution of <cultural practice or movement>.",
-                "In detail, Explain the benefits and considerations of <lifestyle choice or diet>."
-            ]
-        )
-
-        # Add more routes if needed
-        self.routes = [change_input, request_router, toggle_voice_feedback, toggle_profile]
-        self.route_layer = RouteLayer(encoder=self.encoder, routes=self.routes)
-
-    def analyze_input(self, input_result):
+        # The routes are defined in Router_logic/Routes/input.json; their names map to actions in ROUTE_ACTIONS
+        routes = load_route_file(self.routes_file)["routes"]
+        index_options = get_route_index_options("input")
+        # Only utterances missing from the route index artifact are embedded
+        route_index = load_route_index("input", routes, self.encoder, **index_options)
+        flush_encoder_cache(self.encoder)
+        signature = routes_signature(routes, self.encoder, index_options)
+        state = RouteState(routes, index_options, route_index, signature, command_matcher=CommandMatcher(routes))
+        state.cascade = self.create_cascade(state)
+
+        # The new state replaces the live one in a single assignment, so turns in flight keep routing meanwhile
+        self.state = state
+        shared_decision_cache.invalidate("input", keep_signature=signature)
+
+    @property
+    def routes(self):
+        return self.state.routes
+
+    @property
+    def route_index(self):
+        return self.state.route_index
+
+    @property
+    def command_matcher(self):
+        return self.state.command_matcher
+
+    @property
+    def cascade(self):
+        return self.state.cascade
+
+    def reload_routes(self, _path=None):
+        try:
+            self.setup_routes()
+            logging.info(f"Reloaded {len(self.routes)} input routes from '{self.routes_file}'")
+        except (OSError, ValueError) as e:
+            logging.error(f"Error reloading the input routes: {e}. Keeping the current routes.")
+
+    def create_cascade(self, state):
+        cascade_config = {**DEFAULT_CASCADE_CONFIG, **get_routing_config(CASCADE_CONFIG_KEY, {})}
+        # The local backend already routes offline, so there is no cheaper stage to put in front of it
+        if not cascade_config.pop("enabled") or self.encoder_backend == "local":
+            return None
+
+        def route_remote(input_result, turn_embedding=None):
+            # Escalations score against the route index of the same state as the local stage
+            return self.route_remote(input_result, turn_embedding, state)
+
+        return CascadedRouter(state.routes, route_remote, **cascade_config)
+
+    def route_remote(self, input_result, turn_embedding=None, state=None):
+        vector = turn_embedding.for_encoder(self.encoder) if turn_embedding else None
+        return (state or self.state).route_index(input_result, vector=vector).name
+
+    def local_route(self, input_result, state=None):
+        """
+        Return (decided, route_name) from what is known without the network: the command matcher and the decision
+        cache. route_name may be None, a cached 'no route' decision.
+        """
+        state = state or self.state
+        # Control commands with their usual wording are resolved lexically, without an embedding request
+        route_name = state.command_matcher.match(input_result)
+        if route_name:
+            return True, route_name
+        # Inputs seen before reuse their decision from the shared cache
+        return shared_decision_cache.get("input", state.signature, input_result)
+
+    def route(self, input_result, turn_embedding=None, state=None, local_decision=None):
+        """
+        :param local_decision: The result of local_route() when the caller already looked it up for this turn.
+        """
+        state = state or self.state
+        decided, route_name = local_decision or self.local_route(input_result, state)
+        if not decided:
+            route_name = self.route_uncached(input_result, turn_embedding, state)
+            shared_decision_cache.put("input", state.signature, input_result, route_name)
+        return route_name
+
+    def route_uncached(self, input_result, turn_embedding=None, state=None):
+        state = state or self.state
+        if state.cascade:
+            return state.cascade(input_result, turn_embedding)
+        return self.route_remote(input_result, turn_embedding, state)
+
+    def route_batch(self, inputs):
+        """
+        Route a list of inputs the way route() does, but with one encoder call for every input that needs the
+        route index. The decision cache is bypassed, so a large corpus neither reads nor evicts live decisions.
+        """
+        state = self.state
+        route_results = [state.command_matcher.match(input_result) for input_result in inputs]
+        pending = [i for i, route_result in enumerate(route_results) if route_result is None]
+        if state.cascade:
+            undecided = []
+            for i in pending:
+                decided, route_results[i] = state.cascade.local_decision(inputs[i])
+                if not decided:
+                    undecided.append(i)
+            pending = undecided
+        if pending:
+            # Embed with the raw encoder so the corpus does not evict the route utterances from the embedding cache
+            encoder = getattr(self.encoder, "encoder", self.encoder)
+            vectors = encoder([inputs[i] for i in pending])
+            for i, choice in zip(pending, state.route_index.score_batch(vectors=vectors)):
+                route_results[i] = choice.name
+        return route_results
+
+    def analyze_inputs(self, inputs, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Analyze many inputs, e.g. logged turns, batch_size inputs per encoder call.
+
+        Args:
+            inputs (iterable of str): The inputs; read one batch at a time.
+            batch_size (int): Inputs embedded per encoder call.
+
+        Returns:
+            generator: (input, {"action": action, "route": route name or None}) in input order.
+        """
+        for chunk in iter_chunks(inputs, batch_size):
+            for input_result, route_result in zip(chunk, self.route_batch(chunk)):
+                yield input_result, {"action": ROUTE_ACTIONS.get(route_result, "none"), "route": route_result}
+
+    def speculate(self, partial_text):
+        """
+        Route a partial transcript and prepare its prompt, so both are ready when the user stops speaking.
+        """
+        turn_embedding = TurnEmbedding(partial_text)
+        route_result = self.route(partial_text, turn_embedding)
+        action = ROUTE_ACTIONS.get(route_result, "none")
+        return {"route": route_result, "prompt": prepare_prompt(action, partial_text, turn_embedding)}
+
+    def prescore(self, partial_text):
+        """
+        Start routing a partial transcript in the background. analyze_input reuses the result when the final
+        transcript matches it.
+        """
+        self.speculation.submit(partial_text)
+
+    def analyze_input(self, input_result, turn_embedding=None, state=None, local_decision=None):
         """
         Analyze the input to determine the appropriate action.
 
         Args:
             input_result (str): The user's input text.
+            turn_embedding (TurnEmbedding, optional): Shared embedding of this turn, reused by every route layer.
+            state (RouteState, optional): Route state snapshot for this turn; the current one by default.
+            local_decision (tuple, optional): local_route() result already looked up for this turn.
 
         Returns:
-            dict: A dictionary containing the action type and any relevant data.
+            dict: A dictionary containing the action type and any relevant data. When a matching partial transcript
+            was pre-scored, it also holds the prompt prepared for it.
         """
-        route_result = self.route_layer(input_result).name
-        if route_result == "change_input":
-            print("change_input")
-            return {"action": "toggle_input_mode"}
-        elif route_result == "Research":
-            print("toggle_input_mode")
-            return {"action": "start_research"}
-        elif route_result == "toggle_voice_feedback":
-            print("toggle_voice_feedback")
-            return {"action": "toggle_voice_feedback"}
-        elif route_result == "request_information":
-            print("request_information")
-            return {"action": "request_information"}
-        elif route_result == "toggle_profile":
-            print("toggle_profile")
-            return {"action": "toggle_profile"}
+        speculation = self.speculation.claim(input_result)
+        if speculation:
+            route_result = speculation["route"]
+            logging.debug(f"Using the route pre-scored on the partial transcript: {route_result}")
         else:
-            return {"action": "none"}
+            # One snapshot of the route state for the whole turn, even if the route file is reloaded meanwhile
+            route_result = self.route(input_result, turn_embedding, state or self.state, local_decision)
+        action = ROUTE_ACTIONS.get(route_result, "none")
+        if action != "none":
+            print(route_result)
+        analysis_result = {"action": action}
+        if speculation and speculation["prompt"]:
+            analysis_result["prompt"] = speculation["prompt"]
+        return analysis_result
+
+
+def prompt_router(action):
+    """
+    The router that builds the prompt for a conversational action, or None for control actions.
+    """
+    if action == "request_information":
+        return Prompt_manager.get()
+    if action == "none":
+        return Sentiment_manager.get()
+    return None
+
+
+def prepare_prompt(action, input_result, turn_embedding=None):
+    """
+    Build the assistant prompt for a conversational action, or return None for control actions.
+    """
+    if action == "request_information":
+        return create_full_prompt(input_result, Prompt_manager.get(), turn_embedding)
+    if action == "none":
+        return create_sentiment_prompt(input_result, Sentiment_manager.get(), turn_embedding)
+    return None
+
+
+def _prepare_parallel_prompt(action, input_result, turn_embedding, chosen):
+    """
+    Build the prompt for one action alongside the input router. future.cancel() cannot stop a build that has started,
+    so the build checks chosen itself and gives up without scoring or caching a decision once the input router has
+    picked another action: before it starts, and again once the shared turn embedding is ready.
+    """
+    if chosen.get("action", action) != action:
+        return None
+    # Fetch the one embedding request of the turn only when this layer's encoder can use it; a local layer scores the
+    # text itself, so it never waits on the network for a vector the input router may not need either
+    if turn_embedding is not None and turn_embedding.for_encoder(prompt_router(action).encoder) is not None:
+        if chosen.get("action", action) != action:
+            return None
+    return prepare_prompt(action, input_result, turn_embedding)
+
+
+def analyze_turn(semantic_input_handler, input_result, turn_embedding=None, parallel=False):
+    """
+    Route a turn with the input router and attach the prompt for conversational actions.
+
+    With parallel, the research and sentiment prompts are prepared at the same time as the input router runs,
+    all sharing the turn embedding. Routing then takes as long as the slowest layer instead of the input router
+    plus the second layer; the build for the action that was not chosen stops once the input router has decided.
+    Nothing runs alongside when the route is known without the network: a claimed speculation, a control command
+    or a cached decision.
+
+    :param semantic_input_handler: The input router.
+    :param input_result: The user's input text.
+    :param turn_embedding: Shared embedding of this turn.
+    :param parallel: Score all three route layers concurrently.
+    :return: The analysis result of the input router.
+    """
+    if not parallel:
+        return semantic_input_handler.analyze_input(input_result, turn_embedding)
+    state = semantic_input_handler.state
+    # A pre-scored partial transcript already carries the route and prompt
+    if semantic_input_handler.speculation.matches(input_result):
+        return semantic_input_handler.analyze_input(input_result, turn_embedding, state)
+    # Control commands and inputs seen before are decided without the network, so nothing needs to run alongside
+    local_decision = semantic_input_handler.local_route(input_result, state)
+    if local_decision[0]:
+        return semantic_input_handler.analyze_input(input_result, turn_embedding, state, local_decision)
+    start = time.perf_counter()
+    chosen = {}  # Holds the input router's action once it is known, so the other build can give up
+    prompt_futures = {
+        action: _parallel_routing_executor.submit(_prepare_parallel_prompt, action, input_result, turn_embedding,
+                                                  chosen)
+        for action in CONVERSATION_ACTIONS
+    }
+    analysis_result = semantic_input_handler.analyze_input(input_result, turn_embedding, state, local_decision)
+    action = analysis_result["action"]
+    chosen["action"] = action
+    for other_action, future in prompt_futures.items():
+        if other_action != action:
+            future.cancel()
+    if action in prompt_futures and "prompt" not in analysis_result:
+        analysis_result["prompt"] = prompt_futures[action].result()
+    logging.debug(f"Parallel routing took {(time.perf_counter() - start) * 1000:.0f} ms")
+    return analysis_result
 
 
-def handle_action(config, assistant, analysis_result, input_result):
+def handle_action(config, assistant, analysis_result, input_result, turn_embedding=None, cancel_token=None):
     match analysis_result["action"]:
         case "toggle_input_mode":
             config.toggle_input_mode()
@@ -151,13 +318,14 @@ def handle_action(config, assistant, analysis_result, input_result):
         case "toggle_profile":
             config.toggle_profile()
         case "request_information":
-            prompt = create_full_prompt(input_result, Prompt_manager)
-            assistant.process_message(prompt)
+            prompt = analysis_result.get("prompt") or prepare_prompt("request_information", input_result,
+                                                                     turn_embedding)
+            assistant.process_message(prompt, cancel_token)
             pass
         case "none":
             # Process the message and convert the response to speech
-            prompt = create_sentiment_prompt(input_result, Sentiment_manager)
+            prompt = analysis_result.get("prompt") or prepare_prompt("none", input_result, turn_embedding)
             print(prompt)
-            assistant.process_message(prompt)
+            assistant.process_message(prompt, cancel_token)
         case _:
             logging.warning(f"Unhandled action type: {analysis_result['action']}")
@@ -0,0 +1,68 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from SemanthaVoiceAssistant.Router_logic.Text_normalisation import normalise_text
+
+# One worker: partial transcripts of a turn arrive one after the other, and only the latest one matters
+_speculation_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="speculative-routing")
+
+
+class RouteSpeculation:
+    """
+    Routes a partial transcript in the background while the user is still speaking.
+
+    When the final transcript arrives it claims the speculative result if the texts match after normalisation.
+    Otherwise the result is discarded and the turn is routed as usual.
+    """
+
+    def __init__(self, speculate):
+        """
+        :param speculate: Callable (text) -> result, run on the speculation worker.
+        """
+        self.speculate = speculate
+        self._pending = None  # (normalised text, future)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def submit(self, partial_text: str):
+        key = normalise_text(partial_text)
+        with self._lock:
+            if self._pending is None or self._pending[0] != key:
+                self._pending = (key, _speculation_executor.submit(self.speculate, partial_text))
+            return self._pending[1]
+
+    def matches(self, final_text: str) -> bool:
+        """
+        Whether a speculation is pending for the final transcript. Unlike claim(), this leaves it in place.
+        """
+        with self._lock:
+            return self._pending is not None and self._pending[0] == normalise_text(final_text)
+
+    def claim(self, final_text: str):
+        """
+        Return the speculative result for the final transcript, or None if there is no matching speculation.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending is None:
+            return None
+        key, future = pending
+        if key != normalise_text(final_text):
+            self.misses += 1
+            future.cancel()
+            logging.debug("Final transcript differs from the last partial. Speculative route discarded.")
+            return None
+        try:
+            result = future.result()
+        except Exception as e:
+            logging.error(f"Speculative routing failed: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def stats(self) -> dict:
+        claimed = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / claimed if claimed else 0.0}
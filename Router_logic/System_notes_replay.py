@@ -0,0 +1,93 @@
+"""
+Measures the prompt tokens saved by sending a route's system notes only when the route changes.
+
+The replay routes a session of user turns like the assistant does: the input router picks the action, and the research
+or sentiment router builds the prompt. The prompts are then sent to a stand-in assistant twice, once with the system
+notes pasted into every prompt (the previous behaviour) and once through the conversation memory, which replaces
+notes already in the history with a short reference. No summaries are made, so the history grows in both runs.
+It reports the tokens of the message itself and of the whole history sent with each turn.
+
+Usage: python -m SemanthaVoiceAssistant.Router_logic.System_notes_replay [local|openai] [session.txt]
+session.txt holds one user turn per line; without it a built-in session is replayed.
+"""
+import sys
+
+from autogen import ConversableAgent
+from dotenv import load_dotenv
+
+from SemanthaVoiceAssistant.Assistant_setup.Conversation_memory import ConversationMemory, count_tokens
+from SemanthaVoiceAssistant.Router_logic.Research_router import Research_route_manager
+from SemanthaVoiceAssistant.Router_logic.RoutingManager import SemanticInputHandler
+from SemanthaVoiceAssistant.Router_logic.Route_index_evaluation import read_queries
+from SemanthaVoiceAssistant.Router_logic.Sentiment_router import Sentiment_router
+
+SESSION = [
+    "In detail, tell me more about the history and development of transformer models.",
+    "In detail, I need detailed information about the attention mechanism.",
+    "In detail, can you provide an in-depth analysis of recurrent networks?",
+    "In detail, tell me more about the history and development of convolutional networks.",
+    "I'm having trouble with the training loss in my model.",
+    "What are common solutions for overfitting in neural networks?",
+    "How do I solve exploding gradients in deep learning?",
+    "I'm having trouble with the learning rate in my optimiser.",
+    "You have a way of brightening my day!",
+    "How does the Semantha Assistant work",
+    "How do i customize the assistant?",
+    "Explain the Samantha program to me. and tell me how to customize it",
+    "In detail, I'm looking for a comprehensive overview of OpenAI's market strategy.",
+    "In detail, can you provide an in-depth analysis of Nvidia and its CEO?",
+    "I'm having trouble with a memory leak in python.",
+]
+ANSWER = "Here is a short answer of about forty words that stands in for the assistant's reply in this replay. " * 2
+
+
+class ReplayAgent(ConversableAgent):
+    def __init__(self, name):
+        super().__init__(name, llm_config=False, human_input_mode="NEVER")
+
+
+def route_session(turns, backend=None) -> list:
+    """
+    Build the prompt for every conversational turn of the session, in order.
+    """
+    input_router = SemanticInputHandler(encoder_backend=backend)
+    prompt_routers = {"request_information": Research_route_manager(encoder_backend=backend),
+                      "none": Sentiment_router(encoder_backend=backend)}
+    prompts = []
+    for turn, result in input_router.analyze_inputs(turns):
+        router = prompt_routers.get(result["action"])
+        if router is not None:
+            _, prompt_result = next(router.analyze_inputs([turn]))
+            prompts.append(prompt_result["prompt"])
+    return prompts
+
+
+def replay(prompts, notes_once: bool) -> list:
+    """
+    Send the prompts to a stand-in assistant and return (message tokens, history tokens) per turn.
+    """
+    memory = ConversationMemory(enabled=False)
+    user_proxy, assistant = ReplayAgent("user"), ReplayAgent("assistant")
+    tokens = []
+    for prompt in prompts:
+        message = memory.before_turn(user_proxy, assistant, prompt) if notes_once else str(prompt)
+        memory.after_turn(user_proxy, assistant, message, ANSWER, latency=0.0)
+        tokens.append((count_tokens(message), memory.chat(user_proxy, assistant).records[-1][1]))
+    return tokens
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    backend = sys.argv[1] if len(sys.argv) > 1 else None
+    session_prompts = route_session(read_queries(sys.argv[2] if len(sys.argv) > 2 else None) or SESSION, backend)
+    every_turn, on_change = replay(session_prompts, notes_once=False), replay(session_prompts, notes_once=True)
+
+    print(f"{'turn':<6}{'route':<26}{'message before':>16}{'after':>8}{'history before':>16}{'after':>8}")
+    for i, (prompt, before, after) in enumerate(zip(session_prompts, every_turn, on_change), start=1):
+        print(f"{i:<6}{str(getattr(prompt, 'route', None)):<26}"
+              f"{before[0]:>16}{after[0]:>8}{before[1]:>16}{after[1]:>8}")
+    turns = len(session_prompts)
+    saved_message = sum(before[0] - after[0] for before, after in zip(every_turn, on_change)) / turns
+    saved_history = sum(before[1] - after[1] for before, after in zip(every_turn, on_change)) / turns
+    print(f"Mean saving per turn: {saved_message:.0f} message tokens, {saved_history:.0f} prompt tokens "
+          f"including history")
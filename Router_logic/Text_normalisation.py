@@ -0,0 +1,15 @@
+import re
+import unicodedata
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalise_text(text: str) -> str:
+    """
+    Lowercase the text, drop punctuation and collapse whitespace, so transcripts that differ only in
+    casing or punctuation compare equal.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = _NON_WORD.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
@@ -0,0 +1,75 @@
+import threading
+
+import numpy as np
+from semantic_router.encoders import OpenAIEncoder
+
+# text-embedding-3 vectors can be shortened by truncating and renormalising, so one request at the largest
+# dimension serves every route layer.
+TURN_EMBEDDING_MODEL = "text-embedding-3-large"
+TURN_EMBEDDING_DIMENSIONS = 3072
+
+_turn_encoder = None
+_turn_encoder_lock = threading.Lock()
+
+
+def get_turn_encoder():
+    global _turn_encoder
+    with _turn_encoder_lock:
+        if _turn_encoder is None:
+            _turn_encoder = OpenAIEncoder(name=TURN_EMBEDDING_MODEL, dimensions=TURN_EMBEDDING_DIMENSIONS,
+                                          score_threshold=0.51)
+        return _turn_encoder
+
+
+def truncate_embedding(vector, dimensions: int) -> np.ndarray:
+    """
+    Shorten an embedding to the given dimensions and renormalise it to unit length.
+    """
+    vector = np.asarray(vector, dtype=np.float32)[:dimensions]
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class TurnEmbedding:
+    """
+    Embeds one user turn once and hands every route layer a vector matching its own dimensions.
+
+    Route layers may score the turn concurrently; the first one to need the vector embeds it and the others wait.
+    The OpenAI encoder is only created then, so turns routed entirely by local encoders need no API key or network.
+    """
+
+    def __init__(self, text: str, encoder=None):
+        self.text = text
+        self._encoder = encoder
+        self._vector = None
+        self._lock = threading.Lock()
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            self._encoder = get_turn_encoder()
+        return self._encoder
+
+    @property
+    def model_name(self) -> str:
+        return self._encoder.name if self._encoder is not None else TURN_EMBEDDING_MODEL
+
+    @property
+    def vector(self) -> np.ndarray:
+        if self._vector is None:
+            with self._lock:
+                if self._vector is None:
+                    self._vector = np.asarray(self.encoder([self.text])[0], dtype=np.float32)
+        return self._vector
+
+    def for_encoder(self, encoder):
+        """
+        Return the turn vector for a route layer encoder, or None when the encoder cannot share it
+        (different model, unknown or larger dimensions) and must embed the text itself.
+        """
+        dimensions = getattr(encoder, "dimensions", None)
+        if encoder.name != self.model_name or not isinstance(dimensions, int):
+            return None
+        if dimensions > TURN_EMBEDDING_DIMENSIONS:
+            return None
+        return truncate_embedding(self.vector, dimensions)
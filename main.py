@@ -1,16 +1,28 @@
+import contextlib
 import logging
 
 import pyfiglet
 from dotenv import load_dotenv
 
-from SemanthaVoiceAssistant.Assistant_setup.Assistant_logic import (
-    initialize_main_assistant_user_proxy,
-    initialize_main_assistant, initialize_local_main_assistant,
-)
+from SemanthaVoiceAssistant.Assistant_setup.Agent_pool import AgentPool
 from SemanthaVoiceAssistant.Assistant_setup.ConfigManager import ConfigurationManager
-from SemanthaVoiceAssistant.Router_logic.RoutingManager import SemanticInputHandler, handle_action
-from SemanthaVoiceAssistant.Config.functions_utils import handle_agent_message, add_horizontal_lines, print_in_bold_green
-from SemanthaVoiceAssistant.Config.recording_utils import get_user_input, text_to_speech
+from SemanthaVoiceAssistant.Assistant_setup.Conversation_memory import (
+    DEFAULT_MEMORY_CONFIG, MEMORY_CONFIG_KEY, shared_conversation_memory,
+)
+from SemanthaVoiceAssistant.Assistant_setup.Turn_pipeline import DEFAULT_PIPELINE_CONFIG, PIPELINE_CONFIG_KEY, TurnPipeline
+from SemanthaVoiceAssistant.Router_logic.RoutingManager import (
+    SemanticInputHandler, analyze_turn, handle_action, Prompt_manager, Sentiment_manager,
+)
+from SemanthaVoiceAssistant.Router_logic.Decision_cache import shared_decision_cache
+from SemanthaVoiceAssistant.Router_logic.Router_warmup import LazyRouter, warm_up_routers
+from SemanthaVoiceAssistant.Router_logic.Turn_embedding import TurnEmbedding
+from SemanthaVoiceAssistant.Config.functions_utils import (
+    handle_agent_message, add_horizontal_lines, print_in_bold_green, stream_agent_message,
+)
+from SemanthaVoiceAssistant.Config.cancellation import TurnController
+from SemanthaVoiceAssistant.Config.recording_utils import get_user_input, listen_for_barge_in, text_to_speech
+from SemanthaVoiceAssistant.Config.speech_streaming import speak_streamed_response
+from SemanthaVoiceAssistant.Function_calls.Web_surfer.Surfer_agent import abort_web_query, prewarm_web_surfer
 
 load_dotenv()
 
@@ -38,14 +50,19 @@ CONFIG_FILE_PATH = "Config/config_file.json"
 DEFAULT_INPUT_MODE = "typing"
 DEFAULT_VOICE_ID = "ThT5KcBeYPX3keUQqHPh"
 DEFAULT_VOICE_FEEDBACK = True
+DEFAULT_PREWARM_WEB_SURFER = False
+DEFAULT_STREAMING_TTS = True
+DEFAULT_INCREMENTAL_ROUTING = False
+DEFAULT_BARGE_IN = True
+DEFAULT_PARALLEL_ROUTING = True
 
 
 
 
 class Assistant:
     def __init__(self, configuration):
-        self.main_assistant = initialize_main_assistant(MAIN_ASSISTANT_INSTRUCTIONS)
-        self.local_assistant = initialize_local_main_assistant(MAIN_ASSISTANT_INSTRUCTIONS)
+        self.agent_pool = AgentPool()
+        self.main_assistant = None
         self.user_proxy = None
         self.config = configuration
         self.input_mode = DEFAULT_INPUT_MODE
@@ -53,26 +70,32 @@ class Assistant:
 
     def update_assistant(self, assistant_type):
         instructions = self.config.get_instructions()
-        self.user_proxy = initialize_main_assistant_user_proxy()
 
         if assistant_type == "local":
             ascii_art = pyfiglet.figlet_format("LOCAL-SAM", font="slant")
             framed_art = add_horizontal_lines(ascii_art, line_length=33)
             print_in_bold_green(framed_art)
-            self.main_assistant = initialize_local_main_assistant(instructions)
         elif assistant_type == "gpt":
             ascii_art = pyfiglet.figlet_format("SEMANTHA", font="slant")
             framed_art = add_horizontal_lines(ascii_art)
             print_in_bold_green(framed_art)
-            self.main_assistant = initialize_main_assistant(instructions)
-
-    def process_message(self, message):
+        # Profiles seen before reuse their pooled agents instead of recreating them
+        self.main_assistant, self.user_proxy = self.agent_pool.get(assistant_type, instructions)
+
+    def process_message(self, message, cancel_token=None):
+        if cancel_token:
+            cancel_token.on_cancel(abort_web_query)
+        if self.config.get_voice_feedback_enabled() and self.config.get_streaming_tts_enabled():
+            # Speak each sentence as soon as it is generated instead of waiting for the full answer
+            chunks = stream_agent_message(message, self.user_proxy, self.main_assistant, cancel_token)
+            speak_streamed_response(chunks, voice_id=self.config.get_voice_id(), cancel_token=cancel_token)
+            return
         processed_message = handle_agent_message(
-            message, self.user_proxy, self.main_assistant
+            message, self.user_proxy, self.main_assistant, cancel_token
         )
-        if self.config.get_voice_feedback_enabled():
+        if self.config.get_voice_feedback_enabled() and processed_message:
             voice_id = self.config.get_voice_id()
-            text_to_speech(processed_message, voice_id=voice_id)
+            text_to_speech(processed_message, voice_id=voice_id, cancel_token=cancel_token)
 
     def update_settings(self, new_input_mode):
         if new_input_mode != self.input_mode:
@@ -85,14 +108,25 @@ class Configuration(ConfigurationManager):
         super().__init__(config_file_path)
         self.last_profile_called = 'profile_assistant'
         self.last_known_config = self.load_config()
-        self.set_config('input_mode', DEFAULT_INPUT_MODE)
-        self.set_config('voice', DEFAULT_VOICE_ID)
-        self.set_config("voice_feedback", DEFAULT_VOICE_FEEDBACK)
-        self.set_config("content", MAIN_ASSISTANT_INSTRUCTIONS)
+        self.set_configs({
+            'input_mode': DEFAULT_INPUT_MODE,
+            'voice': DEFAULT_VOICE_ID,
+            "voice_feedback": DEFAULT_VOICE_FEEDBACK,
+            "content": MAIN_ASSISTANT_INSTRUCTIONS,
+        })
 
     def get_voice_feedback_enabled(self):
         return self.get_config('voice_feedback', DEFAULT_VOICE_FEEDBACK)
 
+    def get_streaming_tts_enabled(self):
+        return self.get_config('streaming_tts', DEFAULT_STREAMING_TTS)
+
+    def get_barge_in_enabled(self):
+        return self.get_config('barge_in', DEFAULT_BARGE_IN)
+
+    def get_parallel_routing_enabled(self):
+        return self.get_config('parallel_routing', DEFAULT_PARALLEL_ROUTING)
+
     def get_instructions(self):
         return self.get_config('content', MAIN_ASSISTANT_INSTRUCTIONS)
 
@@ -100,14 +134,17 @@ class Configuration(ConfigurationManager):
         return self.get_config('voice', DEFAULT_VOICE_ID)
 
     def profile_assistant(self):
-        self.set_config('voice', DEFAULT_VOICE_ID)
-        self.set_config("content", MAIN_ASSISTANT_INSTRUCTIONS)
-        self.last_known_config = self.load_config()
+        with self.batch():
+            self.set_config('voice', DEFAULT_VOICE_ID)
+            self.set_config("content", MAIN_ASSISTANT_INSTRUCTIONS)
+        # The write is debounced, so take the snapshot from memory rather than the file
+        self.last_known_config = self.config.copy()
         assistant.update_assistant(assistant_type="gpt")
 
     def sam_profile(self):
-        self.set_config('voice', "zcAOhNBS3c14rBihAFp1")
-        self.set_config("content", """You are Sam. Sam embodies a blend of a wise mentor and and a young and adept 
+        with self.batch():
+            self.set_config('voice', "zcAOhNBS3c14rBihAFp1")
+            self.set_config("content", """You are Sam. Sam embodies a blend of a wise mentor and and a young and adept 
         intellectual as a younger man. Sam will encourage the user to challenge their assumptions, promoting a robust 
         understanding complex projects concepts through engaging and stimulating dialogues.
         
@@ -121,8 +158,8 @@ class Configuration(ConfigurationManager):
         Finaly, remember to read the SYSTEM NOTES provided with the user queries, they provide additional usefull 
         information.
         """
-                        )
-        self.last_known_config = self.load_config()
+                            )
+        self.last_known_config = self.config.copy()
         assistant.update_assistant(assistant_type="local")
 
     def toggle_profile(self):
@@ -136,17 +173,20 @@ class Configuration(ConfigurationManager):
             print("Base_profile")
 
     def load_and_update_config(self):
-        current_config = self.load_config()
-        if current_config != self.last_known_config:
+        # Only a real change to the file (new stat signature) is read and parsed; otherwise this is one os.stat
+        current_config = self.reload_if_changed()
+        if current_config is not None and current_config != self.last_known_config:
             self.last_known_config = current_config.copy()
             return current_config
         return None
 
 
 class InputHandler:
-    def __init__(self, assistant_logic, configuration):
+    def __init__(self, assistant_logic, configuration, on_partial=None, on_wake_word=None):
         self.assistant = assistant_logic
         self.config = configuration
+        self.on_partial = on_partial
+        self.on_wake_word = on_wake_word
 
     def get_input(self):
         while True:
@@ -158,7 +198,7 @@ class InputHandler:
                     logging.info(f"Input mode changed to: {new_input_mode}")
             if self.assistant.config.get_config('input_mode') == "recording":
                 logging.debug("Recording mode activated. Please speak...")
-                input_results = get_user_input()
+                input_results = get_user_input(on_partial=self.on_partial, on_wake_word=self.on_wake_word)
             else:
                 input_results = input("Enter your message: ")
             if input_results:
@@ -167,11 +207,27 @@ class InputHandler:
                 logging.debug("No input detected. Checking input mode again...")
 
 
-def process_input(input_handler, semantic_input_handler, config, assistant):
+def process_input(input_handler, semantic_input_handler, config, assistant, turn_controller=None):
     input_result = input_handler.get_input()
     if input_result:
-        analysis_result = semantic_input_handler.analyze_input(input_result)
-        handle_action(config, assistant, analysis_result, input_result)
+        turn_controller = turn_controller or TurnController()
+        cancel_token = turn_controller.start_turn()
+        # In voice mode, saying the wake word while the answer plays interrupts it
+        barge_in = (listen_for_barge_in(cancel_token)
+                    if config.get_barge_in_enabled() and config.get_config('input_mode') == "recording"
+                    else contextlib.nullcontext())
+        try:
+            with barge_in:
+                # Embed the turn once; every route layer reuses the vector at its own dimensions
+                turn_embedding = TurnEmbedding(input_result)
+                analysis_result = analyze_turn(semantic_input_handler.get(), input_result, turn_embedding,
+                                               parallel=config.get_parallel_routing_enabled())
+                handle_action(config, assistant, analysis_result, input_result, turn_embedding, cancel_token)
+        except KeyboardInterrupt:
+            # Ctrl+C during a turn stops the answer; at the input prompt it still quits
+            cancel_token.cancel("keypress")
+        finally:
+            turn_controller.finish_turn(cancel_token)
         config.load_and_update_config()
     else:
         logging.info("No input received, waiting for next input...")
@@ -179,15 +235,52 @@ def process_input(input_handler, semantic_input_handler, config, assistant):
 
 if __name__ == "__main__":
     config = Configuration(CONFIG_FILE_PATH)
+    # Routers encode their routes in the background while the assistant starts up
+    semantic_input_handler = LazyRouter(SemanticInputHandler)
+    warm_up_routers(semantic_input_handler, Prompt_manager, Sentiment_manager)
+    if config.get_config("prewarm_web_surfer", DEFAULT_PREWARM_WEB_SURFER):
+        prewarm_web_surfer()
+    shared_conversation_memory.configure(**{**DEFAULT_MEMORY_CONFIG, **config.get_config(MEMORY_CONFIG_KEY, {})})
     assistant = Assistant(config)
-    input_handler = InputHandler(assistant, config)
-    semantic_input_handler = SemanticInputHandler()
 
-    while True:
+    def prescore_partial(partial_text):
+        semantic_input_handler.get().prescore(partial_text)
+
+    # Route partial transcripts while the user speaks; costs one extra Whisper request per pause
+    on_partial = prescore_partial if config.get_config("incremental_routing", DEFAULT_INCREMENTAL_ROUTING) else None
+    turn_controller = TurnController()
+
+    pipeline_config = {**DEFAULT_PIPELINE_CONFIG, **config.get_config(PIPELINE_CONFIG_KEY, {})}
+    if pipeline_config["enabled"]:
+        def interrupt_turn():
+            turn_controller.cancel_current("wake word")
+
+        # The capture stage runs during answers, so the wake word can interrupt them directly
+        on_wake_word = interrupt_turn if config.get_barge_in_enabled() else None
+        input_handler = InputHandler(assistant, config, on_partial=on_partial, on_wake_word=on_wake_word)
+        # Capture, routing, generation and speech run as concurrent stages instead of one turn at a time
+        pipeline = TurnPipeline(input_handler, semantic_input_handler, config, assistant,
+                                queue_size=pipeline_config["queue_size"], turn_controller=turn_controller)
         try:
-            process_input(input_handler, semantic_input_handler, config, assistant)
+            pipeline.run()
         except KeyboardInterrupt:
             logging.info("Shutdown requested by user.")
-            break
-        except Exception as e:
-            logging.error(f"An error occurred: {e}")
+    else:
+        input_handler = InputHandler(assistant, config, on_partial=on_partial)
+        while True:
+            try:
+                process_input(input_handler, semantic_input_handler, config, assistant, turn_controller)
+            except KeyboardInterrupt:
+                logging.info("Shutdown requested by user.")
+                break
+            except Exception as e:
+                logging.error(f"An error occurred: {e}")
+    logging.info(f"Cancellation latency: {turn_controller.stats()}")
+    if semantic_input_handler.ready:
+        logging.info(f"Control commands resolved without the network: "
+                     f"{semantic_input_handler.get().command_matcher.stats()}")
+        if semantic_input_handler.get().cascade:
+            logging.info(f"Input router cascade escalations: {semantic_input_handler.get().cascade.stats()}")
+    logging.info(f"Routing decision cache: {shared_decision_cache.stats()}")
+    logging.info(f"Conversation memory: {shared_conversation_memory.stats()}")
+    shared_conversation_memory.report()